@@ -58,8 +58,9 @@ def main():
     parser.add_argument(
         '--attributes', '-a',
         nargs='+',
-        default=[],
-        help='Attributes to add to the generated code'
+        default=None,
+        help='Attributes to add to the generated code (default: static inline '
+             '__attribute__((always_inline)), none when prototypes are also generated)'
     )
     parser.add_argument(
         '--output', '-o',
@@ -69,9 +70,8 @@ def main():
     )
     parser.add_argument(
         '--prototypes', '-p',
-        type=bool,
         default=False,
-        action="store",
+        action="store_true",
         help='Generate prototypes (default: False)'
     )
     parser.add_argument(
@@ -114,6 +114,43 @@ def main():
         default=None,
         help='Regex pattern to filter generated intrinsics by name (applied to the full __riscv_v* label)'
     )
+    parser.add_argument(
+        '--unroll-independent',
+        default=False,
+        action="store_true",
+        help='Zvdot4a8i: use independent per-lane accumulators reduced by an add tree (costs 3 extra register groups)'
+    )
+    parser.add_argument(
+        '--group-lanes',
+        default=False,
+        action="store_true",
+        help='Zvdot4a8i: gather byte lanes into a single register group (vcreate/vget) for LMUL=2 and LMUL=4'
+    )
+    parser.add_argument(
+        '--brev8-lut',
+        default=False,
+        action="store_true",
+        help='Zvkb: emulate vbrev8 with a vrgather nibble lookup table instead of shift/mask swaps '
+             '(requires VLEN * LMUL >= 128)'
+    )
+    parser.add_argument(
+        '--zvbb',
+        default=False,
+        action="store_true",
+        help='Zvzip: assume Zvbb is available and emulate vzip with widening shifts (vwsll)'
+    )
+    parser.add_argument(
+        '--zip-slides',
+        default=False,
+        action="store_true",
+        help='Zvzip: emulate 64-bit vzip with masked slides instead of a vrgatherei16 (for cores with a slow vrgather)'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=None,
+        help='Zvkb/Zvzip: generate independent blocks in a pool of JOBS processes, 0 for one per CPU (default: serial)'
+    )
     args = parser.parse_args()
     
     # Convert CLI strings to enum values (None means "all")
@@ -141,6 +178,8 @@ def main():
             tail_policy_filter=tail_policy_filter,
             mask_policy_filter=mask_policy_filter,
             label_filter=label_filter,
+            brev8_lut=args.brev8_lut,
+            jobs=args.jobs,
         ))
     
     if args.extension in ('zvdot4a8i', 'all'):
@@ -153,6 +192,8 @@ def main():
             tail_policy_filter=tail_policy_filter,
             mask_policy_filter=mask_policy_filter,
             label_filter=label_filter,
+            unroll_independent=args.unroll_independent,
+            group_lanes=args.group_lanes,
         ))
 
     if args.extension in ('zvzip', 'all'):
@@ -166,6 +207,9 @@ def main():
             tail_policy_filter=tail_policy_filter,
             mask_policy_filter=mask_policy_filter,
             label_filter=label_filter,
+            has_zvbb=args.zvbb,
+            elen_slides=args.zip_slides,
+            jobs=args.jobs,
         ))
 
     if args.extension in ('zvabd', 'all'):
@@ -186,7 +230,7 @@ def main():
     if args.output:
         with open(args.output, 'w') as f:
             f.write(result)
-        print(f"Generated emulation code written to: {args.output}")
+        print(f"Generated emulation code written to: {args.output}", file=sys.stderr)
     else:
         print(result)
 
@@ -28,9 +28,12 @@ from .core import (
     generate_node_format_type_string,
     generate_intrinsic_type_tag,
     generate_intrinsic_name,
+    generate_intrinsic_signature,
     generate_intrinsic_prototype,
     generate_operation,
     generate_intrinsic_from_operation,
+    generate_intrinsic_proto_and_def,
+    generate_intrinsic_sections,
 )
 
 __version__ = "0.1.0"
@@ -57,7 +60,10 @@ __all__ = [
     "generate_node_format_type_string",
     "generate_intrinsic_type_tag",
     "generate_intrinsic_name",
+    "generate_intrinsic_signature",
     "generate_intrinsic_prototype",
     "generate_operation",
     "generate_intrinsic_from_operation",
+    "generate_intrinsic_proto_and_def",
+    "generate_intrinsic_sections",
 ]
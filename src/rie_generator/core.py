@@ -5,7 +5,10 @@ This module provides the fundamental types, classes, and functions for
 generating C code that emulates RISC-V vector instructions.
 """
 
+import os
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum, auto
+from functools import lru_cache, partial
 
 
 # Enum class of integer types
@@ -47,6 +50,7 @@ class EltType(Enum):
         else:
             raise ValueError(f"Invalid element type: {elt_type}")
     @staticmethod
+    @lru_cache(maxsize=None)
     def widen(elt_type: 'EltType') -> 'EltType':
         widening_map = {
             EltType.U8: EltType.U16,
@@ -59,6 +63,7 @@ class EltType(Enum):
         return widening_map.get(elt_type)
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def narrow(elt_type: 'EltType') -> 'EltType':
         narrowing_map = {
             EltType.U16: EltType.U8,
@@ -95,24 +100,9 @@ class LMULType(Enum):
 
     @staticmethod
     def to_string(lmul_type: 'LMULType') -> str:
-        if lmul_type == LMULType.MF8:
-            return "mf8"
-        elif lmul_type == LMULType.MF4:
-            return "mf4"
-        elif lmul_type == LMULType.MF2:
-            return "mf2"
-        elif lmul_type == LMULType.M1:
-            return "m1"
-        elif lmul_type == LMULType.M2:
-            return "m2"
-        elif lmul_type == LMULType.M4:
-            return "m4"
-        elif lmul_type == LMULType.M8:
-            return "m8"
-        elif lmul_type is None:
-            return "undefined(None)"
-        else:
+        if lmul_type not in LMUL_STRINGS:
             raise ValueError(f"Invalid LMUL type: {lmul_type}")
+        return LMUL_STRINGS[lmul_type]
 
     @staticmethod
     def to_value(lmul_type: 'LMULType') -> float:
@@ -149,11 +139,13 @@ class LMULType(Enum):
         return VALUE_MAP[value]
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def divide(lmul_type: 'LMULType', divisor: int) -> 'LMULType':
         """Divide an LMUL type by a power-of-two divisor."""
         return LMULType.from_value(LMULType.to_value(lmul_type) / divisor)
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def multiply(lmul_type: 'LMULType', factor: int) -> 'LMULType':
         """Multiply an LMUL type by a power-of-two factor."""
         return LMULType.from_value(LMULType.to_value(lmul_type) * factor)
@@ -166,6 +158,17 @@ class LMULType(Enum):
         eew_bytes = eew // 8
         return (LMULType.to_value(lmul_type) / eew_bytes) >= 1/8
 
+LMUL_STRINGS = {
+    LMULType.MF8: "mf8",
+    LMULType.MF4: "mf4",
+    LMULType.MF2: "mf2",
+    LMULType.M1: "m1",
+    LMULType.M2: "m2",
+    LMULType.M4: "m4",
+    LMULType.M8: "m8",
+    None: "undefined(None)",
+}
+
 class OperationType(Enum):
     ROR = auto()
     ROL = auto()
@@ -173,6 +176,7 @@ class OperationType(Enum):
     SRL = auto()
     SRA = auto()
     NSRL = auto() 
+    NSRA = auto()
     ADD = auto()
     SUB = auto()
     RSUB = auto()
@@ -208,6 +212,7 @@ class OperationType(Enum):
     WADD = auto()
     WADDU = auto()
     WSUB = auto()
+    WSLL = auto()
     ZEXT_VF2 = auto()
     ZIP = auto()
     UNZIP_EVEN = auto()
@@ -220,6 +225,9 @@ class OperationType(Enum):
     MERGE = auto()
     SLIDEDOWN = auto()
     SLIDEUP = auto()
+    RGATHER = auto()
+    RGATHEREI16 = auto()
+    VID = auto()
 
     COMPRESS = auto()
 
@@ -244,143 +252,115 @@ class OperationType(Enum):
     INPUT = auto()
     IMMEDIATE = auto()
 
+    @staticmethod
+    def is_multiply_accumulate(op_type: 'OperationType') -> bool:
+        """Check if an operation is a destructive multiply-accumulate,
+            whose first operand is both the accumulator and the destination"""
+        return op_type in [OperationType.WMACC, OperationType.WMACCU, OperationType.WMACCSU, OperationType.WMACCUS]
+
     @staticmethod
     def to_string(op_type: 'OperationType') -> str:
-        if op_type == OperationType.ROR:
-            return "ror"
-        elif op_type == OperationType.ROL:
-            return "rol"
-        elif op_type == OperationType.SLL:
-            return "sll"
-        elif op_type == OperationType.SRL:
-            return "srl"
-        elif op_type == OperationType.SRA:
-            return "sra"
-        elif op_type == OperationType.NSRL:
-            return "nsrl"
-        elif op_type == OperationType.RSUB:
-            return "rsub"
-        elif op_type == OperationType.ADD:
-            return "add"
-        elif op_type == OperationType.SUB:
-            return "sub"
-        elif op_type == OperationType.OR:
-            return "or"
-        elif op_type == OperationType.AND:
-            return "and"
-        elif op_type == OperationType.ANDN:
-            return "andn"
-        elif op_type == OperationType.NOT:
-            return "not"
-        elif op_type == OperationType.XOR:
-            return "xor"
-        elif op_type == OperationType.BREV8:
-            return "brev8"
-        elif op_type == OperationType.REV8:
-            return "rev8"
-        elif op_type == OperationType.WMACC:
-            return "wmacc"
-        elif op_type == OperationType.WMACCU:
-            return "wmaccu"
-        elif op_type == OperationType.WMACCSU:
-            return "wmaccsu"
-        elif op_type == OperationType.WMACCUS:
-            return "wmaccus"
-        elif op_type == OperationType.DOT4A:
-            return "dot4a"
-        elif op_type == OperationType.DOT4AU:
-            return "dot4au"
-        elif op_type == OperationType.DOT4ASU:
-            return "dot4asu"
-        elif op_type == OperationType.DOT4AUS:
-            return "dot4aus"
-        elif op_type == OperationType.WMUL:
-            return "wmul"
-        elif op_type == OperationType.WMULU:
-            return "wmulu"
-        elif op_type == OperationType.WMULSU:
-            return "wmulsu"
-        elif op_type == OperationType.WADD:
-            return "wadd"
-        elif op_type == OperationType.WADDU:
-            return "waddu"
-        elif op_type == OperationType.WSUB:
-            return "wsub"
-        elif op_type == OperationType.REINTERPRET:
-            return "reinterpret"
-        elif op_type == OperationType.CREATE:
-            return "create"
-        elif op_type == OperationType.GET:
-            return "get"
-        elif op_type == OperationType.MIN:
-            return "min"
-        elif op_type == OperationType.MAX:
-            return "max"
-        elif op_type == OperationType.MINU:
-            return "minu"
-        elif op_type == OperationType.MAXU:
-            return "maxu"
-        elif op_type == OperationType.ABS:
-            return "abs"
-        elif op_type == OperationType.ABD:
-            return "abd"
-        elif op_type == OperationType.ABDU:
-            return "abdu"
-        elif op_type == OperationType.WABDA:
-            return "wabda"
-        elif op_type == OperationType.WABDAU:
-            return "wabdau"
-        elif op_type == OperationType.VSETVLMAX:
-            return "vsetvlmax"
-        elif op_type == OperationType.ZEXT_VF2:
-            return "zext_vf2"
-        elif op_type == OperationType.ZIP:
-            return "zip"
-        elif op_type == OperationType.UNZIP_EVEN:
-            return "unzipe"
-        elif op_type == OperationType.UNZIP_ODD:
-            return "unzipo"
-        elif op_type == OperationType.PAIR_EVEN:
-            return "paire"
-        elif op_type == OperationType.PAIR_ODD:
-            return "pairo"
-        elif op_type == OperationType.MV:
-            return "mv"
-        elif op_type == OperationType.MERGE:
-            return "merge"
-        elif op_type == OperationType.SLIDEDOWN:
-            return "slidedown"
-        elif op_type == OperationType.SLIDEUP:
-            return "slideup"
-        elif op_type == OperationType.COMPRESS:
-            return "compress"
-        elif op_type == OperationType.LT:
-            # assume signed integer comparison
-            # FIXME: support floating-point and unsigned (through operands format introspection ?)
-            return "mslt"
-        elif op_type == OperationType.LE:
-            # assume signed integer comparison
-            # FIXME: support floating-point and unsigned (through operands format introspection ?)
-            return "msle"
-        elif op_type == OperationType.GT:
-            # assume signed integer comparison
-            # FIXME: support floating-point and unsigned (through operands format introspection ?)
-            return "msgt"
-        elif op_type == OperationType.GE:
-            # assume signed integer comparison
-            # FIXME: support floating-point and unsigned (through operands format introspection ?)
-            return "msge"
-        elif op_type == OperationType.GEU:
-            # assume unsigned integer comparison
-            return "msgeu"
-        else:
+        if op_type not in OPERATION_MNEMONICS:
             raise ValueError(f"Invalid operation type: {op_type}")
+        return OPERATION_MNEMONICS[op_type]
+
+# intrinsic mnemonic of each operation type (see OperationType.to_string)
+OPERATION_MNEMONICS = {
+    OperationType.ROR: "ror",
+    OperationType.ROL: "rol",
+    OperationType.SLL: "sll",
+    OperationType.SRL: "srl",
+    OperationType.SRA: "sra",
+    OperationType.NSRL: "nsrl",
+    OperationType.NSRA: "nsra",
+    OperationType.RSUB: "rsub",
+    OperationType.ADD: "add",
+    OperationType.SUB: "sub",
+    OperationType.OR: "or",
+    OperationType.AND: "and",
+    OperationType.ANDN: "andn",
+    OperationType.NOT: "not",
+    OperationType.XOR: "xor",
+    OperationType.BREV8: "brev8",
+    OperationType.REV8: "rev8",
+    OperationType.WMACC: "wmacc",
+    OperationType.WMACCU: "wmaccu",
+    OperationType.WMACCSU: "wmaccsu",
+    OperationType.WMACCUS: "wmaccus",
+    OperationType.DOT4A: "dot4a",
+    OperationType.DOT4AU: "dot4au",
+    OperationType.DOT4ASU: "dot4asu",
+    OperationType.DOT4AUS: "dot4aus",
+    OperationType.WMUL: "wmul",
+    OperationType.WMULU: "wmulu",
+    OperationType.WMULSU: "wmulsu",
+    OperationType.WADD: "wadd",
+    OperationType.WADDU: "waddu",
+    OperationType.WSUB: "wsub",
+    OperationType.WSLL: "wsll",
+    OperationType.REINTERPRET: "reinterpret",
+    OperationType.CREATE: "create",
+    OperationType.GET: "get",
+    OperationType.MIN: "min",
+    OperationType.MAX: "max",
+    OperationType.MINU: "minu",
+    OperationType.MAXU: "maxu",
+    OperationType.ABS: "abs",
+    OperationType.ABD: "abd",
+    OperationType.ABDU: "abdu",
+    OperationType.WABDA: "wabda",
+    OperationType.WABDAU: "wabdau",
+    OperationType.VSETVLMAX: "vsetvlmax",
+    OperationType.ZEXT_VF2: "zext_vf2",
+    OperationType.ZIP: "zip",
+    OperationType.UNZIP_EVEN: "unzipe",
+    OperationType.UNZIP_ODD: "unzipo",
+    OperationType.PAIR_EVEN: "paire",
+    OperationType.PAIR_ODD: "pairo",
+    OperationType.MV: "mv",
+    OperationType.MERGE: "merge",
+    OperationType.SLIDEDOWN: "slidedown",
+    OperationType.SLIDEUP: "slideup",
+    OperationType.RGATHER: "rgather",
+    OperationType.RGATHEREI16: "rgatherei16",
+    OperationType.VID: "id",
+    OperationType.COMPRESS: "compress",
+    # assume signed integer comparison
+    # FIXME: support floating-point and unsigned (through operands format introspection ?)
+    OperationType.LT: "mslt",
+    OperationType.LE: "msle",
+    OperationType.GT: "msgt",
+    OperationType.GE: "msge",
+    # assume unsigned integer comparison
+    OperationType.GEU: "msgeu",
+}
 
 class OperationDescriptor:
+    __slots__ = ("op_type",)
+
     def __init__(self, op_type):
-        self.op_type = op_type
+        object.__setattr__(self, "op_type", op_type)
+
+    # descriptors hash by value and are used as cache keys: they are frozen
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (OperationDescriptor, (self.op_type,))
+
+    def __eq__(self, other):
+        return isinstance(other, OperationDescriptor) and self.op_type == other.op_type
+
+    def __hash__(self):
+        return hash(self.op_type)
 
 class Node:
+    # IR nodes are allocated by the thousands: no per-instance __dict__
+    # Nodes are immutable once built and freely shared: generators memoize
+    # sub-graphs (formats, immediates, masks, policy independent operands)
+    # across functions and calls, so a node must never be mutated or recycled.
+    __slots__ = ("node_type", "node_format")
+
     def __init__(self):
         self.node_type = NodeType.UNDEFINED
         self.node_format = None
@@ -401,16 +381,38 @@ class NodeType(Enum):
     UNDEFINED = auto()
 
 class NodeFormatDescriptor:
+    __slots__ = ("node_format_type", "elt_type", "lmul_type", "_hash")
+
     def __init__(self, node_format_type: NodeFormatType, elt_type: EltType, lmul_type: LMULType=None):
-        self.node_format_type = node_format_type
-        self.elt_type = elt_type
-        self.lmul_type = lmul_type
+        object.__setattr__(self, "node_format_type", node_format_type)
+        object.__setattr__(self, "elt_type", elt_type)
+        object.__setattr__(self, "lmul_type", lmul_type)
+        # descriptors are frozen (see __setattr__): the hash is computed once
+        object.__setattr__(self, "_hash", hash(self._key()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (NodeFormatDescriptor, self._key())
+
+    def _key(self) -> tuple:
+        return (self.node_format_type, self.elt_type, self.lmul_type)
+
+    # descriptors are compared (and used as cache keys) by value
+    def __eq__(self, other):
+        return self is other or (isinstance(other, NodeFormatDescriptor) and self._key() == other._key())
+
+    def __hash__(self):
+        return self._hash
 
     def __str__(self):
         return f"{self.node_format_type.name}_{self.elt_type.name}_{LMULType.to_string(self.lmul_type)}"
 
 
 class Immediate(Node):
+    __slots__ = ("value",)
+
     def __init__(self, node_format: NodeFormatDescriptor, value: int):
         self.node_format = node_format
         self.value = value
@@ -420,6 +422,8 @@ class Immediate(Node):
         return f"Immediate(node_format={str(self.node_format)}, value={self.value})"
 
 class Input(Node):
+    __slots__ = ("index", "name")
+
     def __init__(self, node_format: NodeFormatDescriptor, index: int, name: str = None  ):
         self.node_format = node_format
         self.index = index
@@ -448,6 +452,8 @@ class MaskPolicy(Enum):
     
 
 class Operation(Node):
+    __slots__ = ("op_desc", "args", "vm", "dst", "tail_policy", "mask_policy")
+
     def __init__(self, node_format: NodeFormatDescriptor, op_desc: OperationDescriptor, *args, vm: Input=None, dst: Input=None, tail_policy: TailPolicy=TailPolicy.UNDEFINED, mask_policy: MaskPolicy=MaskPolicy.UNDEFINED):
         self.node_format = node_format
         self.op_desc = op_desc
@@ -458,17 +464,22 @@ class Operation(Node):
         self.tail_policy = tail_policy
         self.mask_policy = mask_policy
 
+# element width (in bits) of each integer element type (see element_size)
+ELEMENT_SIZES = {
+    EltType.U8: 8,
+    EltType.S8: 8,
+    EltType.U16: 16,
+    EltType.S16: 16,
+    EltType.U32: 32,
+    EltType.S32: 32,
+    EltType.U64: 64,
+    EltType.S64: 64,
+}
+
 def element_size(elt_type: EltType) -> int:
-    if elt_type == EltType.U8 or elt_type == EltType.S8:
-        return 8
-    elif elt_type == EltType.U16 or elt_type == EltType.S16:
-        return 16
-    elif elt_type == EltType.U32 or elt_type == EltType.S32:
-        return 32
-    elif elt_type == EltType.U64 or elt_type == EltType.S64:
-        return 64
-    else:
+    if elt_type not in ELEMENT_SIZES:
         raise ValueError("Invalid integer type")
+    return ELEMENT_SIZES[elt_type]
 
 def get_scalar_format(node_format: NodeFormatDescriptor) -> NodeFormatDescriptor:
     return NodeFormatDescriptor(NodeFormatType.SCALAR, node_format.elt_type, None)
@@ -527,6 +538,9 @@ def vector_type_to_mask_type(node_format: NodeFormatDescriptor) -> str:
     n = vector_mask_bool_size(node_format)
     return f"vbool{n}_t"
 
+# format -> C string helpers are pure functions of a (hashable) descriptor,
+# called for every emitted node: their results are cached
+@lru_cache(maxsize=None)
 def generate_node_format_type_string(node_format: NodeFormatDescriptor) -> str:
     if node_format.node_format_type == NodeFormatType.VECTOR:
         return int_type_to_vector_type(node_format.elt_type, node_format.lmul_type)
@@ -541,6 +555,7 @@ def generate_node_format_type_string(node_format: NodeFormatDescriptor) -> str:
     else:
         raise ValueError("Invalid operand type")
 
+@lru_cache(maxsize=None)
 def generate_intrinsic_type_tag(node_format: NodeFormatDescriptor) -> str:
     if node_format.node_format_type == NodeFormatType.MASK:
         return f"b{vector_mask_bool_size(node_format)}"
@@ -558,90 +573,131 @@ def generate_intrinsic_type_tag(node_format: NodeFormatDescriptor) -> str:
 
 
 def generate_intrinsic_name(prototype: Operation) -> str:
-    intrinsic_type_tag = generate_intrinsic_type_tag(prototype.node_format)
+    # the name only depends on the formats, operation and policies of the node:
+    # structurally equal nodes (e.g. per-variant copies of a sub-graph) share it
+    return _generate_intrinsic_name(prototype.node_format, prototype.op_desc.op_type,
+                                    tuple(arg.node_format for arg in prototype.args),
+                                    prototype.tail_policy, prototype.mask_policy)
+
+@lru_cache(maxsize=4096)
+def _generate_intrinsic_name(node_format: NodeFormatDescriptor, op_type: OperationType, arg_formats: tuple,
+                             tail_policy: TailPolicy, mask_policy: MaskPolicy) -> str:
+    intrinsic_type_tag = generate_intrinsic_type_tag(node_format)
     # building operand type descriptor (vv, vx, vi)
     operand_type_descriptor = "_" # initial "_" to allow removal (e.g. vzext) 
-    for (index, arg) in enumerate(prototype.args):
-        if len(prototype.args) > 3 and index == 0 and prototype.op_desc.op_type not in [OperationType.MERGE]:
+    for (index, arg_format) in enumerate(arg_formats):
+        if len(arg_formats) > 3 and index == 0 and op_type not in [OperationType.MERGE]:
             # for 3-operand instructions (e.g. vfmadd or vwmacc), the first operand is never
             # described in the name suffix
             # Note: 3-operand instructions have actually 4 operands when vl is taken into account
             continue
-        if arg.node_format.node_format_type == NodeFormatType.VECTOR:
+        if arg_format.node_format_type == NodeFormatType.VECTOR:
             # w for wide, v for vector
             # w is not used for some single operand operations (e.g. reinterpret)
-            dst_fmt_size = element_size(prototype.node_format.elt_type)
-            src_fmt_size = element_size(arg.node_format.elt_type)
-            if (len(prototype.args) > 1 and src_fmt_size > dst_fmt_size) or \
-                (prototype.op_desc.op_type in [OperationType.WADD, OperationType.WSUB, OperationType.WADDU] and src_fmt_size == dst_fmt_size) :
+            dst_fmt_size = element_size(node_format.elt_type)
+            src_fmt_size = element_size(arg_format.elt_type)
+            if (len(arg_formats) > 1 and src_fmt_size > dst_fmt_size) or \
+                (op_type in [OperationType.WADD, OperationType.WSUB, OperationType.WADDU] and src_fmt_size == dst_fmt_size) :
                 operand_type_descriptor += "w"
-            else: # element_size(args.node_format.elt_type) == element_size(prototype.node_format.elt_type):
+            else: # element_size(arg_format.elt_type) == element_size(node_format.elt_type):
                 operand_type_descriptor += "v"
                 
-        elif arg.node_format.node_format_type == NodeFormatType.SCALAR:
+        elif arg_format.node_format_type == NodeFormatType.SCALAR:
             operand_type_descriptor += "x"
-        elif arg.node_format.node_format_type == NodeFormatType.IMMEDIATE:
+        elif arg_format.node_format_type == NodeFormatType.IMMEDIATE:
             operand_type_descriptor += "i"
-        elif arg.node_format.node_format_type == NodeFormatType.MASK:
+        elif arg_format.node_format_type == NodeFormatType.MASK:
             operand_type_descriptor += "m"
+    # multiply-accumulate intrinsics take (vd, vs1/rs1, vs2) but are named after
+    # the vs2 operand first (e.g. vwmacc_vx(vd, rs1, vs2))
+    if OperationType.is_multiply_accumulate(op_type):
+        operand_type_descriptor = "_" + operand_type_descriptor[:0:-1]
     # Some intrinsics (e.g. reinterpret, create, get) require the source type
     # to be displayed in the name suffix, and use 'v' as operand descriptor
-    if prototype.op_desc.op_type in [OperationType.REINTERPRET, OperationType.CREATE, OperationType.GET]:
-        source_type_tag = generate_intrinsic_type_tag(prototype.args[0].node_format)
+    if op_type in [OperationType.REINTERPRET, OperationType.CREATE, OperationType.GET]:
+        source_type_tag = generate_intrinsic_type_tag(arg_formats[0])
         intrinsic_type_tag = f"{source_type_tag}_{intrinsic_type_tag}"
         operand_type_descriptor = "_v"
 
     # Some intrinsics (comparison), require the the source type to be displayed in the name
     # suffix, but also require the full type descriptor to be used for the destination
-    if prototype.op_desc.op_type in [OperationType.LT, OperationType.LE, OperationType.GT, OperationType.GE, OperationType.GEU]:
-        source_type_tag = generate_intrinsic_type_tag(prototype.args[0].node_format)
+    if op_type in [OperationType.LT, OperationType.LE, OperationType.GT, OperationType.GE, OperationType.GEU]:
+        source_type_tag = generate_intrinsic_type_tag(arg_formats[0])
         intrinsic_type_tag = f"{source_type_tag}_{intrinsic_type_tag}"
 
-    if prototype.op_desc.op_type in [OperationType.ZEXT_VF2]:
+    if op_type in [OperationType.ZEXT_VF2]:
         operand_type_descriptor = ""
 
-    # if prototype.op_desc.op_type in [OperationType.MERGE]:
+    # if op_type in [OperationType.MERGE]:
     #    # vmerge is always a v[vxi]m operation
     #    operand_type_descriptor += "m"
 
     suffix = ""
     # in rvv-intrinsics-doc, tail policy always come before mask policy
     # TODO: handle tail and mask AGNOSTIC policies
-    if prototype.tail_policy == TailPolicy.UNDISTURBED:
+    if tail_policy == TailPolicy.UNDISTURBED:
         suffix += "tu"
-    if prototype.mask_policy == MaskPolicy.AGNOSTIC:
+    if mask_policy == MaskPolicy.AGNOSTIC:
         suffix += "m"
-    elif prototype.mask_policy == MaskPolicy.UNDISTURBED:
+    elif mask_policy == MaskPolicy.UNDISTURBED:
         suffix += "mu"
     suffix = f"_{suffix}" if suffix != "" else ""
     # vmv uses special naming: __riscv_vmv_v_x_<type> (v_ prefix for destination)
-    if prototype.op_desc.op_type == OperationType.MV:
+    if op_type == OperationType.MV:
         operand_type_descriptor = f"_v{operand_type_descriptor}"
-    intrinsic_name = f"__riscv_v{OperationType.to_string(prototype.op_desc.op_type)}{operand_type_descriptor}_{intrinsic_type_tag}{suffix}"
+    # vid only takes vl: __riscv_vid_v_<type>
+    if op_type == OperationType.VID:
+        operand_type_descriptor = "_v"
+    intrinsic_name = f"__riscv_v{OperationType.to_string(op_type)}{operand_type_descriptor}_{intrinsic_type_tag}{suffix}"
     return intrinsic_name
 
-def generate_intrinsic_prototype(prototype: Operation) -> str:
-    # generate intrinsic name
+def get_intrinsic_param_name(src: Node) -> str:
+    assert src.node_type == NodeType.INPUT
+    if src.name is not None:
+        return src.name
+    else:
+        return f"op{src.index}"
+
+def generate_intrinsic_signature(prototype: Operation) -> tuple:
+    """Build the C signature of an intrinsic prototype.
+
+    Returns a tuple (dst_type, intrinsic_name, params) where params is the
+    ordered list of (C type, Input node) pairs of the intrinsic parameters."""
     intrinsic_name = generate_intrinsic_name(prototype)
-    # generate prototype
     dst_type = generate_node_format_type_string(prototype.node_format)
-    src_types = [generate_node_format_type_string(arg.node_format) for arg in prototype.args]
+    params = [(generate_node_format_type_string(arg.node_format), arg) for arg in prototype.args]
+    # if any tail/mask policy is set to undisturbed and the destination is not already an argument
+    # (e.g. destructive MAC operations) then it needs to be added before all arguments
     if (prototype.tail_policy == TailPolicy.UNDISTURBED or prototype.mask_policy == MaskPolicy.UNDISTURBED) and prototype.dst not in prototype.args:
         assert prototype.dst is not None
-        src_types = [generate_node_format_type_string(prototype.dst.node_format)] + src_types
+        params.insert(0, (generate_node_format_type_string(prototype.dst.node_format), prototype.dst))
     # in rvv-intrinsics-doc, vm come before tail (arguments order)
     if prototype.mask_policy not in (MaskPolicy.UNDEFINED, MaskPolicy.UNMASKED):
-        src_types = [generate_node_format_type_string(prototype.vm.node_format)] + src_types
-    prototype = f"{dst_type} {intrinsic_name}({', '.join(src_types)})"
-    return f"{prototype};"
+        params.insert(0, (generate_node_format_type_string(prototype.vm.node_format), prototype.vm))
+    return dst_type, intrinsic_name, params
+
+def generate_prototype_from_signature(signature: tuple) -> str:
+    dst_type, intrinsic_name, params = signature
+    src_types = [src_type for src_type, _ in params]
+    return f"{dst_type} {intrinsic_name}({', '.join(src_types)});"
+
+def generate_intrinsic_prototype(prototype: Operation) -> str:
+    return generate_prototype_from_signature(generate_intrinsic_signature(prototype))
 
 class CodeObject:
+    # The emitted statements form a linear, topologically ordered list:
+    # each IR node is lowered once (see generate_operation memoization),
+    # so the body is built by appending and joined a single time.
     def __init__(self, code: str):
-        self.code = code
+        self.statements = [code] if code else []
         self.free_var_idx = 0
 
+    @property
+    def code(self) -> str:
+        return "".join(self.statements)
+
     def append(self, code: str):
-        self.code += code
+        self.statements.append(code)
 
     def allocate_new_free_var(self) -> str:
         var = f"tmp{self.free_var_idx}"
@@ -662,10 +718,21 @@ def generate_operation(code: CodeObject, op: Node, memoization_map: dict[str]) -
             return memoization_map[op]
         elif op.node_format.node_format_type == NodeFormatType.VECTOR or any(arg.node_format.node_format_type == NodeFormatType.VECTOR for arg in op.args):
             # generate intrinsic call
-            intrinsic_arg_list = [generate_operation(code, arg, memoization_map) for arg in op.args]
+            op_type = op.op_desc.op_type
+            is_mac = OperationType.is_multiply_accumulate(op_type)
+            evaluation_order = list(range(len(op.args)))
+            if is_mac:
+                # the accumulator is evaluated last: a chain of multiply-accumulates
+                # is emitted after all its multiplicands, without interleaving them
+                evaluation_order = evaluation_order[1:] + evaluation_order[:1]
+            arg_vars = {index: generate_operation(code, op.args[index], memoization_map) for index in evaluation_order}
+            intrinsic_arg_list = [arg_vars[index] for index in range(len(op.args))]
             # CREATE and GET are pure register manipulation — no vl/tail/mask
-            if op.op_desc.op_type not in (OperationType.CREATE, OperationType.GET):
-                if (op.tail_policy == TailPolicy.UNDISTURBED or op.mask_policy == MaskPolicy.UNDISTURBED):
+            if op_type not in (OperationType.CREATE, OperationType.GET):
+                if is_mac:
+                    # the accumulator operand already provides the destination
+                    assert op.dst is None or op.dst is op.args[0]
+                elif (op.tail_policy == TailPolicy.UNDISTURBED or op.mask_policy == MaskPolicy.UNDISTURBED):
                     assert op.dst is not None
                     intrinsic_arg_list.insert(0, generate_operation(code, op.dst, memoization_map))
                 if op.mask_policy not in (MaskPolicy.UNDEFINED, MaskPolicy.UNMASKED):
@@ -687,9 +754,9 @@ def generate_scalar_operation(code: CodeObject, op: Node, memoization_map: dict[
     # Those arguments should not be evaluated
     if op.op_desc.op_type == OperationType.VSETVLMAX:
         vsetvlmax_fmt = op.args[0].node_format
-        lmul = LMULType.to_value(vsetvlmax_fmt.lmul_type)
+        lmul = LMULType.to_string(vsetvlmax_fmt.lmul_type)
         elt_size = element_size(vsetvlmax_fmt.elt_type)
-        return f"__riscv_vsetvlmax_e{elt_size}m{lmul}()"
+        return f"__riscv_vsetvlmax_e{elt_size}{lmul}()"
 
     arg_list = [generate_operation(code, arg, memoization_map) for arg in op.args]
     if op.op_desc.op_type == OperationType.ADD:
@@ -712,6 +779,8 @@ def generate_scalar_operation(code: CodeObject, op: Node, memoization_map: dict[
         expression = f"{arg_list[0]} ^ {arg_list[1]}"
     elif op.op_desc.op_type == OperationType.NOT:
         expression = f"~{arg_list[0]}"
+    elif op.op_desc.op_type == OperationType.REINTERPRET:
+        expression = f"({int_type_to_scalar_type(op.node_format.elt_type)}){arg_list[0]}"
     elif op.op_desc.op_type == OperationType.SLL:
         expression = f"{arg_list[0]} << {arg_list[1]}"
     elif op.op_desc.op_type == OperationType.SRL:
@@ -761,28 +830,25 @@ def generate_scalar_operation(code: CodeObject, op: Node, memoization_map: dict[
     return temp_var
     
 
-def generate_intrinsic_from_operation(prototype: Operation, emulation: Operation, attributes: list[str]) -> str:
-    intrinsic_name = generate_intrinsic_name(prototype)
-    # generate body
-    dst_type = generate_node_format_type_string(prototype.node_format)
-    src_types = [generate_node_format_type_string(arg.node_format) for arg in prototype.args]
-    def get_src_name(src: Node) -> str:
-        assert src.node_type == NodeType.INPUT
-        if src.name is not None:
-            return src.name
-        else:
-            return f"op{src.index}"
-    src_list = [f"{src_type} {get_src_name(src)}" for src, src_type in zip(prototype.args, src_types)]
-    memoisation_map = {src: get_src_name(src) for src in prototype.args}
-    # if any tail/mask policy is set to undisturbed and the destination is not already an argument
-    # (e.g. destructive MAC operations) then it needs to be added before all arguments
-    if (prototype.tail_policy == TailPolicy.UNDISTURBED or prototype.mask_policy == MaskPolicy.UNDISTURBED) and not prototype.dst in prototype.args:
-        assert prototype.dst is not None
-        src_list.insert(0, f"{dst_type} {get_src_name(prototype.dst)}")
-        memoisation_map[prototype.dst] = get_src_name(prototype.dst)
-    if prototype.mask_policy not in [MaskPolicy.UNDEFINED, MaskPolicy.UNMASKED]:
-        src_list.insert(0, f"{generate_node_format_type_string(prototype.vm.node_format)} {get_src_name(prototype.vm)}")
-        memoisation_map[prototype.vm] = get_src_name(prototype.vm)
+# attributes used by generators when the caller does not provide any: the emulation
+# must be inlined so that its vsetvli sequence merges with the caller's vtype state
+DEFAULT_ATTRIBUTES = ["static", "inline", "__attribute__((always_inline))"]
+
+
+def resolve_attributes(attributes: list[str], prototypes: bool) -> list[str]:
+    """Attributes of the generated definitions: <attributes> when provided (even
+    empty), DEFAULT_ATTRIBUTES when None, or none at all when prototypes are also
+    generated, since a static definition cannot follow a non-static prototype"""
+    if attributes is not None:
+        return attributes
+    return [] if prototypes else DEFAULT_ATTRIBUTES
+
+
+def generate_definition_from_signature(signature: tuple, emulation: Operation, attributes: list[str]) -> str:
+    dst_type, intrinsic_name, params = signature
+    # the parameters are the pre-rendered leaves of the emulation
+    memoisation_map = {src: get_intrinsic_param_name(src) for _, src in params}
+    src_list = [f"{src_type} {memoisation_map[src]}" for src_type, src in params]
     attributes_str = " ".join(attributes)
     header = f"{attributes_str} {dst_type} {intrinsic_name}({', '.join(src_list)}) {{\n"
     code = CodeObject("")
@@ -790,10 +856,60 @@ def generate_intrinsic_from_operation(prototype: Operation, emulation: Operation
     footer = f"  return {result};\n}}"
     return header + code.code + footer
 
+def generate_intrinsic_from_operation(prototype: Operation, emulation: Operation, attributes: list[str]) -> str:
+    return generate_definition_from_signature(generate_intrinsic_signature(prototype), emulation, attributes)
+
+def generate_intrinsic_proto_and_def(prototype: Operation, emulation: Operation, attributes: list[str]) -> tuple:
+    """Generate both the prototype and the definition of an intrinsic.
+
+    The signature is built once and shared by the two outputs.
+    Returns a tuple (prototype string, definition string), the definition is
+    None when emulation is None (prototype only generation)."""
+    signature = generate_intrinsic_signature(prototype)
+    if emulation is None:
+        return generate_prototype_from_signature(signature), None
+    return generate_prototype_from_signature(signature), generate_definition_from_signature(signature, emulation, attributes)
+
+def generate_intrinsic_sections(insns, prototypes: bool, definitions: bool,
+                                proto_header: str = "// prototypes", def_header: str = "// intrinsics") -> str:
+    """Lay out the prototype and/or definition sections of a list of rendered
+    (intrinsic name, prototype string, definition string) intrinsics, each
+    output line being preceded by a newline."""
+    proto_lines = ["\n" + proto_header] if prototypes else []
+    def_lines = ["\n\n" + def_header] if definitions else []
+    for _, proto_str, def_str in insns:
+        if prototypes:
+            proto_lines.append("\n" + proto_str)
+        if definitions:
+            def_lines.append("\n" + def_str)
+    return "".join(proto_lines + def_lines)
+
+def generate_blocks(generate_block, blocks: list, jobs: int = None, **block_kwargs) -> list:
+    """[generate_block(block, **block_kwargs) for block in blocks], computed in a
+    pool of <jobs> processes when jobs is greater than 1 (0 uses one process per CPU).
+
+    The blocks must be independent and generate_block a module-level function:
+    only its arguments and results cross the process boundary. The results keep
+    the order of blocks, and no more processes than blocks are started."""
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs is None or jobs <= 1 or len(blocks) <= 1:
+        return [generate_block(block, **block_kwargs) for block in blocks]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(blocks))) as executor:
+        return list(executor.map(partial(generate_block, **block_kwargs), blocks))
+
 def expand_reinterpret_cast(source: Operation, cast_to_type: NodeFormatDescriptor) -> Operation:
     if source.node_format == cast_to_type or source.node_format.node_format_type != NodeFormatType.VECTOR:
         return source
 
+    # chained vector reinterprets are folded: the cast restarts from the
+    # original source, which may already have the requested type
+    while source.node_type == NodeType.OPERATION and source.op_desc.op_type == OperationType.REINTERPRET and \
+            source.args[0].node_format.node_format_type == NodeFormatType.VECTOR:
+        source = source.args[0]
+    if source.node_format.elt_type == cast_to_type.elt_type:
+        return source
+
     # Reinterpret cast does not support change of both signedness and element width at once
     # so we need to split them into two operations
     if EltType.is_signed(source.node_format.elt_type) != EltType.is_signed(cast_to_type.elt_type):
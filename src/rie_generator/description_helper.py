@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Callable
 from .core import TailPolicy, MaskPolicy, Operation, OperationDescriptor, NodeFormatDescriptor, NodeFormatType, EltType, LMULType, Immediate, OperationType, Node
 
@@ -54,13 +55,17 @@ def emulate_with_split_lmul(result_fmt: NodeFormatDescriptor, operands: list, vl
                        result_lo, result_hi)
     return result
 
+@lru_cache(maxsize=None)
 def get_vlmax(elt_type: EltType, lmul_type: LMULType) -> Node:
+    """Get VLMAX for (elt_type, lmul_type) as a Node, shared by all callers
+    (IR nodes are never mutated once built)"""
     vl_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None)
     vlmax_fmt = NodeFormatDescriptor(NodeFormatType.PLACEHOLDER, elt_type, lmul_type)
     vlmax_placeholder = Immediate(vlmax_fmt, None)
     vlmax = Operation(vl_fmt, OperationDescriptor(OperationType.VSETVLMAX), vlmax_placeholder)
     return vlmax
 
+@lru_cache(maxsize=None)
 def get_vlenb() -> Node:
     """Get vlenb (VLEN in bytes) as a Node"""
     return get_vlmax(EltType.U8, LMULType.M1)
@@ -7,6 +7,9 @@ This module generates C code for emulating RISC-V Zvabd vector
 instructions using standard RVV 1.0 intrinsics.
 """
 
+import io
+from functools import lru_cache
+
 from .core import (
     Operation,
     OperationDescriptor,
@@ -20,8 +23,9 @@ from .core import (
     LMULType,
     OperationType,
     generate_intrinsic_name,
-    generate_intrinsic_prototype,
-    generate_intrinsic_from_operation,
+    generate_intrinsic_proto_and_def,
+    generate_intrinsic_sections,
+    resolve_attributes,
     TailPolicy,
     MaskPolicy,
 )
@@ -33,6 +37,11 @@ from .description_helper import get_vlenb
 # Emulation building blocks
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=None)
+def scalar_zero(elt_type: EltType) -> Immediate:
+    """Shared scalar 0 immediate of <elt_type>, immediates are never mutated once built"""
+    return Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, elt_type, None), 0)
+
 def vabs_emulation(vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
     elt_type = vs2.node_format.elt_type
     mask_type = NodeFormatDescriptor(NodeFormatType.MASK, elt_type, vs2.node_format.lmul_type)
@@ -40,14 +49,14 @@ def vabs_emulation(vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPol
         mask_type,
         OperationDescriptor(OperationType.LT),
         vs2,
-        Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, elt_type, None), 0),
+        scalar_zero(elt_type),
         vl,
     )
     neg = Operation(
         vs2.node_format,
         OperationDescriptor(OperationType.RSUB),
         vs2,
-        Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, elt_type, None), 0),
+        scalar_zero(elt_type),
         vl,
     )
     select = Operation(
@@ -67,7 +76,7 @@ def vabs_emulation(vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPol
             vs2.node_format,
             OperationDescriptor(OperationType.OR),
             select,
-            Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, elt_type, None), 0),
+            scalar_zero(elt_type),
             vl,
             vm=vm,
             tail_policy=tail_policy,
@@ -119,7 +128,7 @@ def vabd_emulation(signed: bool, vs2: Node, vs1: Node, vl: Node, vm: Node, vd: N
             vs2.node_format,
             OperationDescriptor(OperationType.OR),
             select,
-            Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, elt_type, None), 0),
+            scalar_zero(elt_type),
             vl,
             vm=vm,
             tail_policy=tail_policy,
@@ -160,7 +169,7 @@ VALID_LMULS = [LMULType.M1, LMULType.M2, LMULType.M4, LMULType.M8]
 # ---------------------------------------------------------------------------
 
 def generate_zvabd_emulation(
-    attributes: list[str] = [],
+    attributes: list[str] = None,
     prototypes: bool = False,
     definitions: bool = True,
     lmul_filter: list = None,
@@ -172,7 +181,8 @@ def generate_zvabd_emulation(
     """Generate all Zvabd instruction emulations.
 
     Args:
-        attributes: list of attributes to add to the generated code
+        attributes: list of attributes to add to the generated code, defaults to
+            DEFAULT_ATTRIBUTES (see resolve_attributes)
         prototypes: if True, generate prototypes only
         definitions: if True, generate definitions only
         lmul_filter: if set, only generate for these LMULType values
@@ -180,16 +190,17 @@ def generate_zvabd_emulation(
         tail_policy_filter: if set, only generate for these TailPolicy values
         mask_policy_filter: if set, only generate for these MaskPolicy values
     """
-    output = []
+    attributes = resolve_attributes(attributes, prototypes)
+    output = io.StringIO()
 
     vl_type = NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None)
     vl = Input(vl_type, 2, name="vl")
 
     elen = 64 # FIXME: get from config
 
-    output.append("#include <stdint.h>\n")
-    output.append("#include <riscv_vector.h>\n")
-    output.append("#include <stddef.h>\n")
+    output.write("#include <stdint.h>\n")
+    output.write("\n#include <riscv_vector.h>\n")
+    output.write("\n#include <stddef.h>\n")
 
     all_elt_sizes = VALID_ELT_SIZES
     all_lmuls = VALID_LMULS
@@ -312,25 +323,19 @@ def generate_zvabd_emulation(
 
                     if label_filter is not None:
                         zvabd_insns = [(p, e) for p, e in zvabd_insns if re.search(label_filter, generate_intrinsic_name(p))]
-                    if prototypes:
-                        output.append("// prototypes")
-                        for proto, _ in zvabd_insns:
-                            output.append(generate_intrinsic_prototype(proto))
-                    if definitions:
-                        output.append("\n// intrinsics")
-                        for proto, emul in zvabd_insns:
-                            output.append(generate_intrinsic_from_operation(proto, emul, attributes=attributes))
-
-
+                    output.write(generate_intrinsic_sections(
+                        [(generate_intrinsic_name(p), *generate_intrinsic_proto_and_def(p, e if definitions else None, attributes))
+                         for p, e in zvabd_insns],
+                        prototypes, definitions))
 
-    return "\n".join(output)
+    return output.getvalue()
 
 
 # ---------------------------------------------------------------------------
 # CLI entry point
 # ---------------------------------------------------------------------------
 
-def main(attributes: list[str] = [], prototypes: bool = False, definitions: bool = True):
+def main(attributes: list[str] = None, prototypes: bool = False, definitions: bool = True):
     """CLI entry point for generating Zvabd emulation code."""
     print(generate_zvabd_emulation(attributes=attributes, prototypes=prototypes, definitions=definitions))
 
@@ -338,9 +343,9 @@ def main(attributes: list[str] = [], prototypes: bool = False, definitions: bool
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument("-a", "--attributes", nargs="+", default=[], help="Attributes to add to the generated code")
+    parser.add_argument("-a", "--attributes", nargs="+", default=None, help="Attributes to add to the generated code (default: static inline always_inline)")
     parser.add_argument("-p", "--prototypes", default=False, action="store_true", help="generate prototypes")
-    parser.add_argument("--no-definitions", default=True, action="store_false", help="do not generate definitions")
+    parser.add_argument("--no-definitions", default=False, action="store_true", help="do not generate definitions")
     args = parser.parse_args()
 
     main(attributes=args.attributes, prototypes=args.prototypes, definitions=not args.no_definitions)
@@ -8,15 +8,22 @@ This module generates C code for emulating RISC-V Zvdot4a8i vector
 dot product instructions (vdota4, vdota4u, vdota4su, vdota4us) using
 standard RVV 1.0 intrinsics.
 
-Emulation strategy (widening multiply + pairwise reduction):
-  1. Widening multiply all 4 byte lanes at once (SEW=8, vl=4*orig_vl)
-  2. Extract high/low product pairs via narrowing shift (SEW=64→32)
-  3. Widening add high + low pairs (SEW=16→32)
-  4. Extract high/low sums via narrowing shift (SEW=64→32)
-  5. Add high + low sums (SEW=32)
-  6. Add with accumulator vd (SEW=32)
+Emulation strategy (byte-lane extraction + widening multiply-accumulate):
+  1. Extract each of the 4 byte lanes of vs2 and vs1 into 16-bit elements
+     at LMUL/2 (narrowing shift, then mask or sign-extend)
+  2. Accumulate the 4 lane products into vd with a chain of widening
+     multiply-accumulate (vwmacc, vwmaccu, vwmaccsu or vwmaccus, SEW=16→32)
+The same skeleton (dot_k_mac) handles other packed lane widths, e.g. 8 x 4-bit
+or 2 x 16-bit dot products into 32-bit accumulators.
+For the .vx forms each byte of rs1 is sliced with a scalar shift and cast,
+and fed directly to the .vx multiply-accumulates (rs1 is never splat).
+All extractions are emitted before the multiply-accumulate chain, so each
+generated function only needs two vtype configurations.
 """
 
+import io
+from functools import lru_cache
+
 from .core import (
     Operation,
     OperationDescriptor,
@@ -30,190 +37,383 @@ from .core import (
     LMULType,
     OperationType,
     generate_intrinsic_name,
-    generate_intrinsic_prototype,
-    generate_intrinsic_from_operation,
+    generate_intrinsic_proto_and_def,
+    generate_intrinsic_sections,
     TailPolicy,
     MaskPolicy,
+    resolve_attributes,
 )
 
-from .description_helper import emulate_with_split_lmul
 
+@lru_cache(maxsize=None)
+def _fmt(node_format_type: NodeFormatType, elt_type: EltType, lmul_type: LMULType = None) -> NodeFormatDescriptor:
+    """Shared NodeFormatDescriptor for a (format type, element type, LMUL) key,
+    descriptors are never mutated once built"""
+    return NodeFormatDescriptor(node_format_type, elt_type, lmul_type)
 
-def dot4_pipeline(
+
+SCALAR_U8_FMT = _fmt(NodeFormatType.SCALAR, EltType.U8)
+SCALAR_S8_FMT = _fmt(NodeFormatType.SCALAR, EltType.S8)
+SCALAR_U16_FMT = _fmt(NodeFormatType.SCALAR, EltType.U16)
+SCALAR_U32_FMT = _fmt(NodeFormatType.SCALAR, EltType.U32)
+VL_FMT = _fmt(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T)
+IDX_FMT = _fmt(NodeFormatType.IMMEDIATE, EltType.SIZE_T)
+
+@lru_cache(maxsize=None)
+def _shift_imm(amount: int) -> Immediate:
+    """Shared shift amount immediate"""
+    return Immediate(SCALAR_U32_FMT, amount)
+
+
+@lru_cache(maxsize=None)
+def _lane_mask_imm(lane_width: int, elt_fmt: NodeFormatDescriptor = SCALAR_U16_FMT) -> Immediate:
+    """Shared immediate masking the <lane_width> least significant bits"""
+    return Immediate(elt_fmt, (1 << lane_width) - 1)
+
+
+def extract_lane(src: Node, lane: int, lane_width: int, signed: bool, vl: Node) -> Node:
+    """Extract the <lane_width>-bit field <lane> of each 32-bit element of src.
+
+    The field is zero-extended (signed=False) or sign-extended (signed=True)
+    into a 16-bit element, the result has half the LMUL of src.
+    lane_width must divide 32 and be at most 16.
+    """
+    lmul = src.node_format.lmul_type
+    half_lmul = LMULType.divide(lmul, 2)
+    lane_msb = lane_width * (lane + 1)
+    if signed:
+        s32_fmt = _fmt(NodeFormatType.VECTOR, EltType.S32, lmul)
+        s16_fmt = _fmt(NodeFormatType.VECTOR, EltType.S16, half_lmul)
+        src = expand_reinterpret_cast(src, s32_fmt)
+        # move the selected field to the most significant position, then
+        # sign-extend it with an arithmetic narrowing shift
+        if lane_msb < 32:
+            src = Operation(s32_fmt, OperationDescriptor(OperationType.SLL),
+                            src, _shift_imm(32 - lane_msb), vl)
+        return Operation(s16_fmt, OperationDescriptor(OperationType.NSRA),
+                         src, _shift_imm(32 - lane_width), vl)
+    u32_fmt = _fmt(NodeFormatType.VECTOR, EltType.U32, lmul)
+    u16_fmt = _fmt(NodeFormatType.VECTOR, EltType.U16, half_lmul)
+    src = expand_reinterpret_cast(src, u32_fmt)
+    field = Operation(u16_fmt, OperationDescriptor(OperationType.NSRL),
+                      src, _shift_imm(lane_width * lane), vl)
+    if lane_width < 16 and lane_msb < 32:
+        # the most significant field is already zero-extended by the shift
+        field = Operation(u16_fmt, OperationDescriptor(OperationType.AND),
+                          field, _lane_mask_imm(lane_width), vl)
+    return field
+
+
+def extract_byte_lane(src: Node, lane: int, signed: bool, vl: Node) -> Node:
+    """Extract byte <lane> of each 32-bit element of src.
+
+    The byte is zero-extended (signed=False) or sign-extended (signed=True)
+    into a 16-bit element, the result has half the LMUL of src.
+    """
+    return extract_lane(src, lane, 8, signed, vl)
+
+
+def extract_scalar_lane(rs1: Node, lane: int, lane_width: int, signed: bool) -> Node:
+    """Extract the <lane_width>-bit field <lane> of the 32-bit scalar rs1.
+
+    The scalar counterpart of extract_lane, used as the rs1 operand of a
+    vector-scalar widening multiply-accumulate. Byte and half-word fields
+    take a single shift and a narrowing cast, the C call promotes the field
+    to the 16-bit rs1 parameter with the expected zero or sign extension.
+    """
+    if lane_width in [8, 16]:
+        if lane > 0:
+            rs1 = Operation(SCALAR_U32_FMT, OperationDescriptor(OperationType.SRL),
+                            rs1, _shift_imm(lane_width * lane))
+        field_elt_type = {
+            (8, False): EltType.U8, (8, True): EltType.S8,
+            (16, False): EltType.U16, (16, True): EltType.S16,
+        }[(lane_width, signed)]
+        return Operation(_fmt(NodeFormatType.SCALAR, field_elt_type), OperationDescriptor(OperationType.REINTERPRET), rs1)
+    lane_msb = lane_width * (lane + 1)
+    if signed:
+        if lane_msb < 32:
+            rs1 = Operation(SCALAR_U32_FMT, OperationDescriptor(OperationType.SLL),
+                            rs1, _shift_imm(32 - lane_msb))
+        rs1 = Operation(_fmt(NodeFormatType.SCALAR, EltType.S32), OperationDescriptor(OperationType.REINTERPRET), rs1)
+        return Operation(SCALAR_S8_FMT, OperationDescriptor(OperationType.SRA),
+                         rs1, _shift_imm(32 - lane_width))
+    if lane > 0:
+        rs1 = Operation(SCALAR_U32_FMT, OperationDescriptor(OperationType.SRL),
+                        rs1, _shift_imm(lane_width * lane))
+    return Operation(SCALAR_U8_FMT, OperationDescriptor(OperationType.AND),
+                     rs1, _lane_mask_imm(lane_width, SCALAR_U32_FMT))
+
+
+def extract_scalar_byte_lane(rs1: Node, lane: int, signed: bool) -> Node:
+    """Extract byte <lane> of the 32-bit scalar rs1 into an 8-bit scalar."""
+    return extract_scalar_lane(rs1, lane, 8, signed)
+
+
+def group_byte_lanes(lanes: list) -> list:
+    """Gather vector byte lanes into one register group (vcreate), and
+    return the lanes read back from it (vget)"""
+    lane_fmt = lanes[0].node_format
+    group_fmt = _fmt(NodeFormatType.VECTOR, lane_fmt.elt_type, LMULType.multiply(lane_fmt.lmul_type, len(lanes)))
+    group = Operation(group_fmt, OperationDescriptor(OperationType.CREATE), *lanes)
+    return [Operation(lane_fmt, OperationDescriptor(OperationType.GET), group, Immediate(IDX_FMT, index))
+            for index in range(len(lanes))]
+
+
+def dot_k_mac(
         vs2: Node,
         vs1: Node,
         vd: Node,
-        wmul_op: OperationType,
-        wadd_op: OperationType,
+        vs2_signed: bool,
+        vs1_signed: bool,
         vl: Node,
         tail_policy: TailPolicy=TailPolicy.AGNOSTIC,
         mask_policy: MaskPolicy=MaskPolicy.UNMASKED,
-        vm: Node = None
+        vm: Node = None,
+        lane_width: int = 8,
+        independent_accumulators: bool = False,
+        group_lanes: bool = False
     ) -> Node:
-    """Common dot product emulation pipeline.
+    """Common packed dot product emulation: chain of widening multiply-accumulates,
+    one per <lane_width>-bit lane of the 32-bit elements (32 / lane_width lanes).
 
     Args:
         vs2: first source operand (vector, 32-bit elements)
         vs1: second source operand (vector or scalar, 32-bit)
         vd: accumulator source (vector, 32-bit)
+        vs2_signed: whether the lanes of vs2 are signed
+        vs1_signed: whether the lanes of vs1 are signed
         vl: vector length
-        wmul_op: widening multiply operation type (WMUL, WMULU, WMULSU)
-        wadd_op: widening add operation type (WADD, WADDU)
-        lmul: original LMUL for 32-bit elements
         tail_policy: tail policy
         mask_policy: mask policy
         vm: mask
+        lane_width: width of the packed lanes: 4, 8 or 16 bits
+        independent_accumulators: if set, each lane accumulates into its own
+            register (lanes other than the first start from zero) and the
+            partial sums are reduced with an add tree, breaking the
+            multiply-accumulate dependency chain at the cost of extra
+            register groups
+        group_lanes: if set, the vector lanes of an operand are gathered
+            into a single register group (vcreate) and read back with vget,
+            giving the register allocator one live range per operand.
+            Only applies when the lanes are at least LMUL=1 and the group
+            fits in LMUL=8 (LMUL=2 and LMUL=4 sources for byte lanes)
     """
-    lmul = vd.node_format.lmul_type
-    # M8 splitting: split into two M4 halves, process independently, reassemble
-    if lmul == LMULType.M8:
-        return emulate_with_split_lmul(vd.node_format, [vs2, vs1, vd], vl, dot4_pipeline, [wmul_op, wadd_op], tail_policy, mask_policy, vm, {})
-
-    # --- Standard path (M1, M2, M4): requires 2*LMUL ≤ M8 ---
-    # Derived formats
-    lmul_x2 = LMULType.multiply(lmul, 2)
-    # SEW=8 at original LMUL (same register group as 32-bit, 4x more elements)
-    u8_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U8, lmul)
-    s8_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.S8, lmul)
-    # SEW=16 at 2*LMUL (widening multiply result)
-    u16_x2_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U16, lmul_x2)
-    s16_x2_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.S16, lmul_x2)
-    # SEW=32 at original LMUL (narrowing result)
-    u32_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U32, lmul)
-    s32_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.S32, lmul)
-    # SEW=16 at original LMUL (for widening add sources)
-    u16_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U16, lmul)
-    s16_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.S16, lmul)
-    # SEW=32 at 2*LMUL (widening add result)
-    u32_x2_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U32, lmul_x2)
-    s32_x2_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.S32, lmul_x2)
-    # SEW=64 at 2*LMUL (narrowing result)
-    u64_x2_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U64, lmul_x2)
-    s64_x2_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.S64, lmul_x2)
-
-    # Choose signed/unsigned formats based on multiply type
-    is_result_signed = wmul_op in (OperationType.WMUL, OperationType.WMULSU)
-    prod_16_x2_fmt = s16_x2_fmt if is_result_signed else u16_x2_fmt
-    prod_32_fmt = s32_fmt if is_result_signed else u32_fmt
-    sum_16_fmt = s16_fmt if is_result_signed else u16_fmt
-    sum_32_x2_fmt = s32_x2_fmt if is_result_signed else u32_x2_fmt
-    result_32_fmt = vd.node_format
-
-    result_64_x2_fmt = s64_x2_fmt if is_result_signed else u64_x2_fmt
-
-    # Scalar formats for shift amounts and vl multiplier
-    scalar_u32_fmt = NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.U32)
-    vl_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None)
-
-    vs2_is_signed = wmul_op in (OperationType.WMUL, OperationType.WMULSU)
-    vs1_is_signed = wmul_op in (OperationType.WMUL, OperationType.WMUL)
-    vs1_fmt = s8_fmt if vs1_is_signed else u8_fmt
-    vs2_fmt = s8_fmt if vs2_is_signed else u8_fmt
-
-    if vs1.node_format.node_format_type is NodeFormatType.SCALAR:
-        vs1 = Operation(u32_fmt, OperationDescriptor(OperationType.MV), vs1, vl)
-    if vs2.node_format.node_format_type is NodeFormatType.SCALAR:
-        vs2 = Operation(u32_fmt, OperationDescriptor(OperationType.MV), vs2, vl)
-
-
     assert vs2.node_format.node_format_type is NodeFormatType.VECTOR
-    assert vs1.node_format.node_format_type is NodeFormatType.VECTOR
-
-    # Step 0: Reinterpret vs1 as u8
-    #vs1_u8 = Operation(u8_fmt, OperationDescriptor(OperationType.REINTERPRET), vs1)
-    vs1_e8 = expand_reinterpret_cast(vs1, vs1_fmt)
-    # Since vs2/vs1 might be swapped, we also need to check whether vs2/rs2 needs to
-    # be reinterpreted
-    #vs2_u8 = Operation(u8_fmt, OperationDescriptor(OperationType.REINTERPRET), vs2)
-    vs2_e8 = expand_reinterpret_cast(vs2, vs2_fmt)
-
-    # Step 1: vl_x4 = 4 * vl (for SEW=8 operations)
-    vl_x4 = Operation(vl_fmt, OperationDescriptor(OperationType.MUL),
-                       vl, Immediate(vl_fmt, 4))
-    # Step 1 (cont.): vl_x2 = 2 * vl (for SEW=16 operations)
-    vl_x2 = Operation(vl_fmt, OperationDescriptor(OperationType.MUL),
-                       vl, Immediate(vl_fmt, 2))
-
-    # Step 1: Widening multiply 8-bit to 16-bit
-    # SEW=8, LMUL=original, vl=4*original_vl
-    products = Operation(prod_16_x2_fmt, OperationDescriptor(wmul_op),
-                         vs2_e8, vs1_e8, vl_x4)
-
-    # reinterpret products as SEW=64  with 2x original LMUL (and original vl, since 64 is twice the original 32-bit SEW)
-    products = Operation(result_64_x2_fmt, OperationDescriptor(OperationType.REINTERPRET), products)
-
-    # narrowing shift only operates on unsigned element, so casting might be required here
-    products = expand_reinterpret_cast(products, u64_x2_fmt)
-
-    # Step 2: Extract high products via narrow right shift by 32
-    # Source: products viewed as SEW=64 at 2*LMUL, result: SEW=32 at LMUL
-    shift_32 = Immediate(scalar_u32_fmt, 32)
-    high_products = Operation(u32_fmt, OperationDescriptor(OperationType.NSRL),
-                              products, shift_32, vl)
-
-    # Step 3: Extract low products via narrow right shift by 0
-    shift_0 = Immediate(scalar_u32_fmt, 0)
-    low_products = Operation(u32_fmt, OperationDescriptor(OperationType.NSRL),
-                             products, shift_0, vl)
+    is_vx = vs1.node_format.node_format_type is NodeFormatType.SCALAR
+
+    assert lane_width in [4, 8, 16]
+    lane_count = 32 // lane_width
+
+    # all lanes are extracted up front, ahead of the multiply-accumulate
+    # chain, so that the emitted code only switches vtype between the two groups
+    vs2_lanes = [extract_lane(vs2, lane, lane_width, vs2_signed, vl) for lane in range(lane_count)]
+    if is_vx:
+        # the lanes of rs1 are sliced in scalar registers and consumed
+        # directly by the .vx form of the multiply-accumulate
+        vs1_lanes = [extract_scalar_lane(vs1, lane, lane_width, vs1_signed) for lane in range(lane_count)]
+    else:
+        vs1_lanes = [extract_lane(vs1, lane, lane_width, vs1_signed, vl) for lane in range(lane_count)]
+
+    lane_lmul_value = LMULType.to_value(vs2_lanes[0].node_format.lmul_type)
+    if group_lanes and 1 <= lane_lmul_value and lane_lmul_value * lane_count <= 8:
+        vs2_lanes = group_byte_lanes(vs2_lanes)
+        if not is_vx:
+            vs1_lanes = group_byte_lanes(vs1_lanes)
+
+    if vs2_signed == vs1_signed:
+        mac_op = OperationType.WMACC if vs2_signed else OperationType.WMACCU
+    elif is_vx:
+        # vwmaccsu.vx: signed rs1 x unsigned vs2, vwmaccus.vx: unsigned rs1 x signed vs2
+        mac_op = OperationType.WMACCUS if vs2_signed else OperationType.WMACCSU
+    else:
+        # vwmaccsu.vv expects its signed operand first
+        mac_op = OperationType.WMACCSU
+    mac_args = [(vs2_lane, vs1_lane) if vs2_signed and not vs1_signed and not is_vx else (vs1_lane, vs2_lane)
+                for vs2_lane, vs1_lane in zip(vs2_lanes, vs1_lanes)]
+
+    if independent_accumulators:
+        zero = Operation(vd.node_format, OperationDescriptor(OperationType.MV), Immediate(SCALAR_U32_FMT, 0), vl)
+        partial_sums = [Operation(vd.node_format, OperationDescriptor(mac_op), vd if lane == 0 else zero, *mac_args[lane], vl)
+                         for lane in range(lane_count)]
+        while len(partial_sums) > 2:
+            partial_sums = [Operation(vd.node_format, OperationDescriptor(OperationType.ADD), lhs, rhs, vl)
+                            for lhs, rhs in zip(partial_sums[0::2], partial_sums[1::2])]
+        # policies are only applied by the final reduction, masked-off and
+        # tail elements are taken from vd
+        return Operation(vd.node_format, OperationDescriptor(OperationType.ADD), *partial_sums, vl,
+                         tail_policy=tail_policy, mask_policy=mask_policy, dst=vd, vm=vm)
+
+    acc = vd
+    for lane_args in mac_args:
+        # every step carries the policies: masked-off and tail elements
+        # are kept from the previous accumulator, i.e. from vd
+        acc = Operation(vd.node_format, OperationDescriptor(mac_op), acc, *lane_args, vl,
+                        tail_policy=tail_policy, mask_policy=mask_policy, dst=acc, vm=vm)
+    return acc
+
+
+def dot4_mac(
+        vs2: Node,
+        vs1: Node,
+        vd: Node,
+        vs2_signed: bool,
+        vs1_signed: bool,
+        vl: Node,
+        tail_policy: TailPolicy=TailPolicy.AGNOSTIC,
+        mask_policy: MaskPolicy=MaskPolicy.UNMASKED,
+        vm: Node = None,
+        **options
+    ) -> Node:
+    """4 x 8-bit dot product emulation (Zvdot4a8i), see dot_k_mac"""
+    return dot_k_mac(vs2, vs1, vd, vs2_signed, vs1_signed, vl, tail_policy, mask_policy, vm, lane_width=8, **options)
 
-    high_products = expand_reinterpret_cast(high_products, prod_32_fmt)
-    low_products = expand_reinterpret_cast(low_products, prod_32_fmt)
 
-    high_products = Operation(sum_16_fmt, OperationDescriptor(OperationType.REINTERPRET),
-                              high_products)
-    low_products = Operation(sum_16_fmt, OperationDescriptor(OperationType.REINTERPRET),
-                              low_products)
+def dot4_uu(vs2: Node, vs1: Node, vd: Node, vl: Node, tail_policy: TailPolicy=TailPolicy.AGNOSTIC,
+            mask_policy: MaskPolicy=MaskPolicy.UNMASKED, vm: Node = None, **options) -> Node:
+    """unsigned(vs2) x unsigned(vs1) dot product (vdota4u),
+    options are forwarded to dot4_mac"""
+    return dot4_mac(vs2, vs1, vd, False, False, vl, tail_policy, mask_policy, vm, **options)
 
-    # Step 4: Widening addition of high and low products
-    # Source: SEW=16 at LMUL, vl=2*original_vl, result: SEW=32 at 2*LMUL
-    sums = Operation(sum_32_x2_fmt, OperationDescriptor(wadd_op),
-                     high_products, low_products, vl_x2)
 
-    # Reinterpret sums as SEW=64 at 2*LMUL
-    sums = Operation(result_64_x2_fmt, OperationDescriptor(OperationType.REINTERPRET), sums)
+def dot4_ss(vs2: Node, vs1: Node, vd: Node, vl: Node, tail_policy: TailPolicy=TailPolicy.AGNOSTIC,
+            mask_policy: MaskPolicy=MaskPolicy.UNMASKED, vm: Node = None, **options) -> Node:
+    """signed(vs2) x signed(vs1) dot product (vdota4)"""
+    return dot4_mac(vs2, vs1, vd, True, True, vl, tail_policy, mask_policy, vm, **options)
 
-    sums = expand_reinterpret_cast(sums, u64_x2_fmt)
 
-    # Step 5: Extract high sums via narrow right shift by 32
-    # Source: sums viewed as SEW=64 at 2*LMUL, result: SEW=32 at LMUL
-    high_sums = Operation(u32_fmt, OperationDescriptor(OperationType.NSRL),
-                          sums, shift_32, vl)
+def dot4_su(vs2: Node, vs1: Node, vd: Node, vl: Node, tail_policy: TailPolicy=TailPolicy.AGNOSTIC,
+            mask_policy: MaskPolicy=MaskPolicy.UNMASKED, vm: Node = None, **options) -> Node:
+    """signed(vs2) x unsigned(vs1) dot product (vdota4su)"""
+    return dot4_mac(vs2, vs1, vd, True, False, vl, tail_policy, mask_policy, vm, **options)
 
-    # Step 6: Extract low sums via narrow right shift by 0
-    low_sums = Operation(u32_fmt, OperationDescriptor(OperationType.NSRL),
-                         sums, shift_0, vl)
 
-    high_sums = expand_reinterpret_cast(high_sums, result_32_fmt)
-    low_sums = expand_reinterpret_cast(low_sums, result_32_fmt)
+def dot4_us(vs2: Node, vs1: Node, vd: Node, vl: Node, tail_policy: TailPolicy=TailPolicy.AGNOSTIC,
+            mask_policy: MaskPolicy=MaskPolicy.UNMASKED, vm: Node = None, **options) -> Node:
+    """unsigned(vs2) x signed(vs1) dot product (vdota4us)"""
+    return dot4_mac(vs2, vs1, vd, False, True, vl, tail_policy, mask_policy, vm, **options)
 
-    # Step 7: Single-width addition of high and low sums (SEW=32)
-    partial_sum = Operation(result_32_fmt, OperationDescriptor(OperationType.ADD),
-                            high_sums, low_sums, vl)
 
-    # Step 8: Final single-width addition with accumulator (vd)
-    result = Operation(result_32_fmt, OperationDescriptor(OperationType.ADD),
-                       partial_sum, vd, vl, tail_policy=tail_policy, mask_policy=mask_policy, dst=vd, vm=vm)
+def dot4_pipeline(
+        vs2: Node,
+        vs1: Node,
+        vd: Node,
+        wmul_op: OperationType,
+        wadd_op: OperationType,
+        vl: Node,
+        tail_policy: TailPolicy=TailPolicy.AGNOSTIC,
+        mask_policy: MaskPolicy=MaskPolicy.UNMASKED,
+        vm: Node = None
+    ) -> Node:
+    """Legacy entry point, forwards to dot4_uu/dot4_ss/dot4_su/dot4_us.
 
-    return result
+    The signedness of each operand is derived from wmul_op (WMULU, WMUL or
+    WMULSU), wadd_op is ignored. A scalar first operand (former operand swap
+    for vdota4us) is moved back to the vs1 position.
+    """
+    dot4_builder = {
+        OperationType.WMULU: dot4_uu,
+        OperationType.WMUL: dot4_ss,
+        OperationType.WMULSU: dot4_su,
+    }[wmul_op]
+    if vs2.node_format.node_format_type is NodeFormatType.SCALAR:
+        # signed(rs1) x unsigned(vs2)
+        assert wmul_op == OperationType.WMULSU
+        return dot4_us(vs1, vs2, vd, vl, tail_policy, mask_policy, vm)
+    return dot4_builder(vs2, vs1, vd, vl, tail_policy, mask_policy, vm)
 
 
 # LMUL values valid for 32-bit elements (SEW=32)
-# M1-M4 use the standard widening pipeline; M8 uses the CREATE/GET split path
-VALID_32BIT_LMULS = [LMULType.M1, LMULType.M2, LMULType.M4, LMULType.M8]
+VALID_32BIT_LMULS = [LMULType.MF2, LMULType.M1, LMULType.M2, LMULType.M4, LMULType.M8]
+
+
+def get_lane_lmul(lmul: LMULType) -> LMULType:
+    """LMUL of the 16-bit byte lanes extracted from 32-bit elements at <lmul>,
+    None if this LMUL is not legal for 16-bit elements"""
+    lane_lmul_value = LMULType.to_value(lmul) / 2
+    if lane_lmul_value < 1 / 8:
+        return None
+    lane_lmul = LMULType.from_value(lane_lmul_value)
+    return lane_lmul if LMULType.is_valid_for_eew(EltType.U16, lane_lmul) else None
+
+
+# Zvdot4a8i instruction variants, in emission order:
+# (operation, dot4 builder, vs2 signed, vs1/rs1 signed, vx form)
+ZVDOT4A8I_VARIANTS = [
+    (OperationType.DOT4AU, dot4_uu, False, False, False),
+    (OperationType.DOT4AU, dot4_uu, False, False, True),
+    (OperationType.DOT4A, dot4_ss, True, True, False),
+    (OperationType.DOT4A, dot4_ss, True, True, True),
+    (OperationType.DOT4ASU, dot4_su, True, False, False),
+    (OperationType.DOT4ASU, dot4_su, True, False, True),
+    # vdota4us only exists in vx form
+    (OperationType.DOT4AUS, dot4_us, False, True, True),
+]
+
+
+def build_dot4_insn(op_type: OperationType, lmul: LMULType, is_vx: bool, tail_policy: TailPolicy, mask_policy: MaskPolicy,
+                    **options) -> tuple:
+    """Build the (prototype, emulation) pair of a Zvdot4a8i instruction variant,
+    options are forwarded to the dot4 builder"""
+    _, dot4_builder, vs2_signed, vs1_signed, _ = next(variant for variant in ZVDOT4A8I_VARIANTS
+                                                     if variant[0] == op_type and variant[4] == is_vx)
+    vint32_t = _fmt(NodeFormatType.VECTOR, EltType.S32, lmul)
+    vuint32_t = _fmt(NodeFormatType.VECTOR, EltType.U32, lmul)
+    vbooln_t = _fmt(NodeFormatType.MASK, EltType.U32, lmul)
+
+    # --- Inputs ---
+    vs2 = Input(vint32_t if vs2_signed else vuint32_t, 0, name="vs2")
+    if is_vx:
+        vs1 = Input(SCALAR_U32_FMT, 1, name="rs1")
+    else:
+        vs1 = Input(vint32_t if vs1_signed else vuint32_t, 1, name="vs1")
+    # the result is signed as soon as one of the operands is
+    vd = Input(vint32_t if vs2_signed or vs1_signed else vuint32_t, 2, name="vd")
+    vm = Input(vbooln_t, -2, name="vm")
+    vl = Input(VL_FMT, 3, name="vl")
+
+    proto = Operation(
+        vd.node_format, OperationDescriptor(op_type),
+        vd, vs2, vs1, vl,
+        dst=vd, tail_policy=tail_policy, mask_policy=mask_policy, vm=vm
+    )
+    emul = dot4_builder(vs2, vs1, vd, vl, tail_policy, mask_policy, vm, **options)
+    return proto, emul
+
+
+@lru_cache(maxsize=None)
+def emit_dot4_insn(op_type: OperationType, lmul: LMULType, is_vx: bool, tail_policy: TailPolicy, mask_policy: MaskPolicy,
+                   attributes: tuple, definitions: bool, independent_accumulators: bool, group_lanes: bool) -> tuple:
+    """Emit a Zvdot4a8i instruction variant, memoized on its (hashable) parameters.
+
+    Returns a tuple (intrinsic name, prototype string, definition string),
+    the definition is None if definitions is False.
+    """
+    proto, emul = build_dot4_insn(op_type, lmul, is_vx, tail_policy, mask_policy,
+                                  independent_accumulators=independent_accumulators, group_lanes=group_lanes)
+    # prototype and definition share a single signature construction
+    proto_str, def_str = generate_intrinsic_proto_and_def(proto, emul if definitions else None, list(attributes))
+    return generate_intrinsic_name(proto), proto_str, def_str
 
 
-def generate_zvdot4a8i_emulation(attributes: list[str] = [], prototypes: bool = False, definitions: bool = True,
+def generate_zvdot4a8i_emulation(attributes: list[str] = None, prototypes: bool = False, definitions: bool = True,
                                   lmul_filter: list = None, tail_policy_filter: list = None, mask_policy_filter: list = None,
-                                  label_filter: str = None):
+                                  label_filter: str = None, unroll_independent: bool = False,
+                                  group_lanes: bool = False):
     """Generate all Zvdot4a8i instruction emulations.
 
     Args:
-        attributes: list of attributes to add to the generated code
+        attributes: list of attributes to add to the generated code, defaults to
+            DEFAULT_ATTRIBUTES (see resolve_attributes)
         prototypes: if True, generate prototypes only
         definitions: if True, generate definitions only
         lmul_filter: if set, only generate for these LMULType values
         tail_policy_filter: if set, only generate for these TailPolicy values
         mask_policy_filter: if set, only generate for these MaskPolicy values
+        unroll_independent: if True, use independent per-lane accumulators
+            reduced by an add tree instead of a single multiply-accumulate chain
+        group_lanes: if True, gather the vector byte lanes into a single
+            register group where LMUL allows it
 
     Generates emulation code for:
       - vdota4.vv / vdota4.vx   (signed-signed)
@@ -221,146 +421,67 @@ def generate_zvdot4a8i_emulation(attributes: list[str] = [], prototypes: bool =
       - vdota4su.vv / vdota4su.vx (signed-unsigned)
       - vdota4us.vx              (unsigned-signed, vx only)
     """
-    output = []
+    attributes = resolve_attributes(attributes, prototypes)
+
+    # every fragment but the first is prefixed with a newline separator
+    output = io.StringIO()
 
-    vl_type = NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None)
-    vl = Input(vl_type, 3, name="vl")
     all_tail_policies = [TailPolicy.UNDISTURBED, TailPolicy.AGNOSTIC]
     all_mask_policies = [MaskPolicy.UNDISTURBED, MaskPolicy.AGNOSTIC, MaskPolicy.UNMASKED]
 
-    output.append("#include <stdint.h>\n")
-    output.append("#include <riscv_vector.h>\n")
-    output.append("#include <stddef.h>\n")
+    output.write("#include <stdint.h>\n")
+    output.write("\n#include <riscv_vector.h>\n")
+    output.write("\n#include <stddef.h>\n")
 
     lmuls = [l for l in VALID_32BIT_LMULS if lmul_filter is None or l in lmul_filter]
     tail_policies = [t for t in all_tail_policies if tail_policy_filter is None or t in tail_policy_filter]
     mask_policies = [m for m in all_mask_policies if mask_policy_filter is None or m in mask_policy_filter]
 
     for lmul in lmuls:
+        # every variant processes vl 32-bit elements, with byte lanes
+        # extracted as 16-bit elements at LMUL/2
+        lane_lmul = get_lane_lmul(lmul)
+        if lane_lmul is None:
+            output.write(f"\n// Zvdot4a8i: LMUL={LMULType.to_string(lmul)} skipped, no legal LMUL for 16-bit byte lanes")
+            continue
         for tail_policy in tail_policies:
             for mask_policy in mask_policies:
-                vint32_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.S32, lmul)
-                vuint32_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U32, lmul)
-                scalar_u32_t = NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.U32, lmul_type=None)
-                vbooln_t = NodeFormatDescriptor(NodeFormatType.MASK, EltType.U32, lmul)
-
-                # --- Inputs ---
-                vs2_u = Input(vuint32_t, 0, name="vs2")
-                vs1_u = Input(vuint32_t, 1, name="vs1")
-                vd_u  = Input(vuint32_t, 2, name="vd")
-                rs1_u = Input(scalar_u32_t, 1, name="rs1")
-
-                vs2_s = Input(vint32_t, 0, name="vs2")
-                vs1_s = Input(vint32_t, 1, name="vs1")
-                vd_s  = Input(vint32_t, 2, name="vd")
-                rs1_s = Input(scalar_u32_t, 1, name="rs1")
-
-                # vd_dst = Input(vint32_t, -1, name="vd")
-                vm = Input(vbooln_t, -2, name="vm")
-                
-                # dst = vd_dst if tail_policy == TailPolicy.UNDISTURBED or mask_policy == MaskPolicy.UNDISTURBED else None
-
-                zvdot4a8i_insns = []
-
-                # --- vdota4u: unsigned-unsigned ---
-                # vv
-                proto_dota4u_vv = Operation(
-                    vuint32_t, OperationDescriptor(OperationType.DOT4AU),
-                    vd_u, vs2_u, vs1_u, vl,
-                    dst=vd_u, tail_policy=tail_policy, mask_policy=mask_policy, vm=vm
-                )
-                emul_dota4u_vv = dot4_pipeline(vs2_u, vs1_u, vd_u, OperationType.WMULU, OperationType.WADDU, vl, tail_policy, mask_policy, vm)
-                zvdot4a8i_insns.append((proto_dota4u_vv, emul_dota4u_vv))
-
-                # vx: use vector-scalar widening multiply directly
-                proto_dota4u_vx = Operation(
-                    vuint32_t, OperationDescriptor(OperationType.DOT4AU),
-                    vd_u, vs2_u, rs1_u, vl,
-                    dst=vd_u, tail_policy=tail_policy, mask_policy=mask_policy, vm=vm
-                )
-                emul_dota4u_vx = dot4_pipeline(vs2_u, rs1_u, vd_u, OperationType.WMULU, OperationType.WADDU, vl, tail_policy, mask_policy, vm)
-                zvdot4a8i_insns.append((proto_dota4u_vx, emul_dota4u_vx))
-
-                # --- vdota4: signed-signed ---
-                # vv
-                proto_dota4_vv = Operation(
-                    vint32_t, OperationDescriptor(OperationType.DOT4A),
-                    vd_s, vs2_s, vs1_s, vl,
-                    dst=vd_s, tail_policy=tail_policy, mask_policy=mask_policy, vm=vm
-                )
-                emul_dota4_vv = dot4_pipeline(vs2_s, vs1_s, vd_s, OperationType.WMUL, OperationType.WADD, vl, tail_policy, mask_policy, vm)
-                zvdot4a8i_insns.append((proto_dota4_vv, emul_dota4_vv))
-
-                # vx
-                proto_dota4_vx = Operation(
-                    vint32_t, OperationDescriptor(OperationType.DOT4A),
-                    vd_s, vs2_s, rs1_s, vl,
-                    dst=vd_s, tail_policy=tail_policy, mask_policy=mask_policy, vm=vm
-                )
-                emul_dota4_vx = dot4_pipeline(vs2_s, rs1_s, vd_s, OperationType.WMUL, OperationType.WADD, vl, tail_policy, mask_policy, vm)
-                zvdot4a8i_insns.append((proto_dota4_vx, emul_dota4_vx))
-
-                # --- vdota4su: signed(vs2)-unsigned(vs1) ---
-                # vv
-                proto_dota4su_vv = Operation(
-                    vint32_t, OperationDescriptor(OperationType.DOT4ASU),
-                    vd_s, vs2_s, vs1_u, vl,
-                    dst=vd_s, tail_policy=tail_policy, mask_policy=mask_policy, vm=vm
-                )
-                emul_dota4su_vv = dot4_pipeline(vs2_s, vs1_u, vd_s, OperationType.WMULSU, OperationType.WADD, vl, tail_policy, mask_policy, vm)
-                zvdot4a8i_insns.append((proto_dota4su_vv, emul_dota4su_vv))
-
-                # vx
-                proto_dota4su_vx = Operation(
-                    vint32_t, OperationDescriptor(OperationType.DOT4ASU),
-                    vd_s, vs2_s, rs1_u, vl,
-                    dst=vd_s, tail_policy=tail_policy, mask_policy=mask_policy, vm=vm
-                )
-                emul_dota4su_vx = dot4_pipeline(vs2_s, rs1_u, vd_s, OperationType.WMULSU, OperationType.WADD, vl, tail_policy, mask_policy, vm)
-                zvdot4a8i_insns.append((proto_dota4su_vx, emul_dota4su_vx))
-
-                # --- vdota4us: unsigned(vs2)-signed(rs1), vx only ---
-                # vwmulsu_vx(vs2, rs1) treats vs2 as signed and rs1 as unsigned.
-                # We need unsigned(vs2) * signed(rs1), so we use swapped operand order.
-                proto_dota4us_vx = Operation(
-                    vint32_t, OperationDescriptor(OperationType.DOT4AUS),
-                    vd_s, vs2_u, rs1_s, vl,
-                    dst=vd_s, tail_policy=tail_policy, mask_policy=mask_policy, vm=vm
-                )
-                # Pass rs1 first (signed) and vs2 second (unsigned) for vwmulsu
-                emul_dota4us_vx = dot4_pipeline(rs1_s, vs2_u, vd_s, OperationType.WMULSU, OperationType.WADD, vl, tail_policy, mask_policy, vm)
-                zvdot4a8i_insns.append((proto_dota4us_vx, emul_dota4us_vx))
+                zvdot4a8i_insns = [
+                    emit_dot4_insn(op_type, lmul, is_vx, tail_policy, mask_policy, tuple(attributes), definitions,
+                                   unroll_independent, group_lanes)
+                    for op_type, _, _, _, is_vx in ZVDOT4A8I_VARIANTS
+                ]
 
                 lmul_str = LMULType.to_string(lmul)
                 tail_policy_str = TailPolicy.to_string(tail_policy)
                 mask_policy_str = MaskPolicy.to_string(mask_policy)
 
                 if label_filter is not None:
-                    zvdot4a8i_insns = [(p, e) for p, e in zvdot4a8i_insns if re.search(label_filter, generate_intrinsic_name(p))]
-                if prototypes:
-                    output.append(f"// Zvdot4a8i prototypes (LMUL={lmul_str}), tail_policy={tail_policy_str}, mask_policy={mask_policy_str}")
-                    for proto, _ in zvdot4a8i_insns:
-                        output.append(generate_intrinsic_prototype(proto))
-
-                if definitions:
-                    output.append(f"\n// Zvdot4a8i definitions (LMUL={lmul_str}), tail_policy={tail_policy_str}, mask_policy={mask_policy_str}")
-                    for proto, emul in zvdot4a8i_insns:
-                        output.append(generate_intrinsic_from_operation(proto, emul, attributes=attributes))
+                    zvdot4a8i_insns = [insn for insn in zvdot4a8i_insns if re.search(label_filter, insn[0])]
+                config_str = f"(LMUL={lmul_str}), tail_policy={tail_policy_str}, mask_policy={mask_policy_str}"
+                output.write(generate_intrinsic_sections(zvdot4a8i_insns, prototypes, definitions,
+                                                         proto_header=f"// Zvdot4a8i prototypes {config_str}",
+                                                         def_header=f"// Zvdot4a8i definitions {config_str}"))
 
-    return "\n".join(output)
+    return output.getvalue()
 
 
-def main(attributes: list[str] = [], prototypes: bool = False, definitions: bool = True):
+def main(attributes: list[str] = None, prototypes: bool = False, definitions: bool = True, unroll_independent: bool = False,
+         group_lanes: bool = False):
     """CLI entry point for generating Zvdot4a8i emulation code."""
-    print(generate_zvdot4a8i_emulation(attributes, prototypes, definitions))
+    print(generate_zvdot4a8i_emulation(attributes, prototypes, definitions, unroll_independent=unroll_independent,
+                                       group_lanes=group_lanes))
 
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument("-a", "--attributes", nargs="+", default=[], help="Attributes to add to the generated code")
+    parser.add_argument("-a", "--attributes", nargs="+", default=None, help="Attributes to add to the generated code (default: static inline always_inline)")
     parser.add_argument("-p", "--prototypes", default=False, action="store_true", help="generate prototypes")
-    parser.add_argument("--no-definitions", default=True, action="store_false", help="do not generate definitions")
+    parser.add_argument("--no-definitions", default=False, action="store_true", help="do not generate definitions")
+    parser.add_argument("--unroll-independent", default=False, action="store_true", help="use independent per-lane accumulators")
+    parser.add_argument("--group-lanes", default=False, action="store_true", help="gather byte lanes into a single register group")
     args = parser.parse_args()
 
-    main(attributes=args.attributes, prototypes=args.prototypes, definitions=not args.no_definitions)
+    main(attributes=args.attributes, prototypes=args.prototypes, definitions=not args.no_definitions,
+         unroll_independent=args.unroll_independent, group_lanes=args.group_lanes)
@@ -7,6 +7,10 @@ This module generates C code for emulating RISC-V Zvkb vector rotate
 instructions (vror, vrol) using standard RVV intrinsics.
 """
 
+import io
+from functools import lru_cache
+from typing import TextIO
+
 from .core import (
     Operation,
     OperationDescriptor,
@@ -15,182 +19,379 @@ from .core import (
     Immediate,
     Input,
     Node,
-    get_scalar_format,
     element_size,
     EltType,
     LMULType,
     OperationType,
+    expand_reinterpret_cast,
+    generate_blocks,
     generate_intrinsic_name,
-    generate_intrinsic_prototype,
-    generate_intrinsic_from_operation,
+    generate_intrinsic_proto_and_def,
+    generate_intrinsic_sections,
+    generate_intrinsic_type_tag,
+    generate_node_format_type_string,
+    vector_type_to_mask_type,
     TailPolicy,
-    MaskPolicy
+    MaskPolicy,
+    resolve_attributes,
 )
 
 
+VL_FMT = NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None)
+
+
+@lru_cache(maxsize=None)
+def _elt_size(elt_type: EltType) -> int:
+    """Element bit size, looked up once per element type"""
+    return element_size(elt_type)
+
+
+@lru_cache(maxsize=None)
+def _scalar_format(elt_type: EltType) -> NodeFormatDescriptor:
+    """Shared scalar format for elt_type (same as get_scalar_format for any
+    vector or scalar format of that element type)"""
+    return NodeFormatDescriptor(NodeFormatType.SCALAR, elt_type, None)
+
+
+@lru_cache(maxsize=None)
+def _scalar_constant(elt_type: EltType, value: int) -> Immediate:
+    """Shared scalar immediate, reused across every LMUL of an element type"""
+    return Immediate(_scalar_format(elt_type), value)
+
+
+@lru_cache(maxsize=None)
+def _vl_constant(value: int) -> Immediate:
+    """Shared vector length (size_t) immediate"""
+    return Immediate(VL_FMT, value)
+
+
+def _elt_mask(elt_type: EltType, pattern: int) -> Immediate:
+    """64-bit mask pattern truncated to the element size of elt_type"""
+    return _scalar_constant(elt_type, pattern & ((1 << _elt_size(elt_type)) - 1))
+
+
+# shared operation descriptors (descriptors are never mutated once built)
+_AND = OperationDescriptor(OperationType.AND)
+_OR = OperationDescriptor(OperationType.OR)
+_SLL = OperationDescriptor(OperationType.SLL)
+_SRL = OperationDescriptor(OperationType.SRL)
+_NOT = OperationDescriptor(OperationType.NOT)
+_RSUB = OperationDescriptor(OperationType.RSUB)
+_MUL = OperationDescriptor(OperationType.MUL)
+_MV = OperationDescriptor(OperationType.MV)
+_SLIDEUP = OperationDescriptor(OperationType.SLIDEUP)
+_RGATHER = OperationDescriptor(OperationType.RGATHER)
+
+
+def _shl(a: Node, k: Node, vl: Node, **policies) -> Operation:
+    return Operation(a.node_format, _SLL, a, k, vl, **policies)
+
+def _shr(a: Node, k: Node, vl: Node, **policies) -> Operation:
+    return Operation(a.node_format, _SRL, a, k, vl, **policies)
+
+def _and(a: Node, b: Node, vl: Node, **policies) -> Operation:
+    return Operation(a.node_format, _AND, a, b, vl, **policies)
+
+def _or(a: Node, b: Node, vl: Node, **policies) -> Operation:
+    return Operation(a.node_format, _OR, a, b, vl, **policies)
+
+
+def _rotate_complement(elts: Node, rot_amount: Node, vl: Node) -> Operation:
+    """Amount of the opposite shift of a rotation: -rot_amount.
+
+    vsll/vsrl only read the log2(SEW) low bits of their shift amount, and SEW is
+    a power of two, so -rot is (SEW - rot) mod SEW without any explicit mask
+    (the canonical (-rot) & (SEW - 1) rotate idiom, the & being done by the
+    shift itself). The negation does not depend on SEW, and rot = 0 (or any
+    multiple of SEW) gives a shift by 0, as required."""
+    zero = _scalar_constant(rot_amount.node_format.elt_type, 0)
+    if rot_amount.node_format.node_format_type == NodeFormatType.SCALAR:
+        return Operation(rot_amount.node_format, _RSUB, rot_amount, zero)
+    return Operation(rot_amount.node_format, _RSUB, rot_amount, zero, vl)
+
+
 def rotate_left(elts: Node, rot_amount: Node, vl: Node, dst: Node = None, vm: Node = None, tail_policy: TailPolicy = TailPolicy.UNDEFINED, mask_policy: MaskPolicy = MaskPolicy.UNDEFINED) -> Node:
     """Generate a rotate left operation using shifts and OR."""
-    left_shift = Operation(
-        elts.node_format,
-        OperationDescriptor(OperationType.SLL),
-        elts, rot_amount, vl
-    )
-    if rot_amount.node_format.node_format_type == NodeFormatType.SCALAR:
-        rsub = Operation(
-            rot_amount.node_format,
-            OperationDescriptor(OperationType.RSUB),
-            rot_amount,
-            Immediate(get_scalar_format(rot_amount.node_format), element_size(elts.node_format.elt_type))
-        )
-    else:
-        rsub = Operation(
-            rot_amount.node_format,
-            OperationDescriptor(OperationType.RSUB),
-            rot_amount,
-            Immediate(get_scalar_format(rot_amount.node_format), element_size(elts.node_format.elt_type)),
-            vl
-        )
-    right_shift = Operation(
-        elts.node_format,
-        OperationDescriptor(OperationType.SRL),
-        elts,
-        rsub,
-        vl   
-    )
-     
-    or_desc = OperationDescriptor(OperationType.OR)
-    return Operation(elts.node_format, or_desc, left_shift, right_shift, vl)
+    left_shift = _shl(elts, rot_amount, vl)
+    right_shift = _shr(elts, _rotate_complement(elts, rot_amount, vl), vl)
+    return _or(left_shift, right_shift, vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
 
 
 def rotate_right(elts: Node, rot_amount: Node, vl: Node, vm: Node = None, dst: Node = None, tail_policy: TailPolicy = TailPolicy.UNDEFINED, mask_policy: MaskPolicy = MaskPolicy.UNDEFINED) -> Node:
     """Generate a rotate right operation using shifts and OR."""
-    right_shift = Operation(
-        elts.node_format,
-        OperationDescriptor(OperationType.SRL),
-        elts, rot_amount, vl
-    )
-    if rot_amount.node_format.node_format_type == NodeFormatType.SCALAR:
-        rsub = Operation(
-            rot_amount.node_format,
-            OperationDescriptor(OperationType.RSUB),
-            rot_amount,
-            Immediate(get_scalar_format(rot_amount.node_format), element_size(elts.node_format.elt_type))
-        )
-    else:
-        rsub = Operation(
-            rot_amount.node_format,
-            OperationDescriptor(OperationType.RSUB),
-            rot_amount,
-            Immediate(get_scalar_format(rot_amount.node_format), element_size(elts.node_format.elt_type)),
-            vl
-        )
-    left_shift = Operation(
-        elts.node_format,
-        OperationDescriptor(OperationType.SLL),
-        elts,
-        rsub,
-        vl
-    )
-     
-    or_desc = OperationDescriptor(OperationType.OR)
-    return Operation(elts.node_format, or_desc, left_shift, right_shift, vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
+    right_shift = _shr(elts, rot_amount, vl)
+    left_shift = _shl(elts, _rotate_complement(elts, rot_amount, vl), vl)
+    return _or(left_shift, right_shift, vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
 
 
 def and_not(op0: Node, op1: Node, vl: Node, vm: Node = None, dst: Node = None, tail_policy: TailPolicy = TailPolicy.UNDEFINED, mask_policy: MaskPolicy = MaskPolicy.UNDEFINED) -> Node:
     """Generate vector andn (and not) using operation RVV 1.0 operation only."""
-    not_desc = OperationDescriptor(OperationType.NOT)
-    not_op1 = Operation(op1.node_format, not_desc, op1, vl)
-    and_desc = OperationDescriptor(OperationType.AND)
-    return Operation(op0.node_format, and_desc, op0, not_op1, vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
+    not_op1 = Operation(op1.node_format, _NOT, op1, vl)
+    return _and(op0, not_op1, vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
+
+
+@lru_cache(maxsize=4096)
+def _shared_op(node_format: NodeFormatDescriptor, op_desc: OperationDescriptor, *args: Node) -> Operation:
+    """Unmasked operation without policy, shared by every request with the same
+    format and operand nodes (e.g. the inner steps of brev8 / rev8 of the
+    policy variants rendered over the same zvkb_operands)"""
+    return Operation(node_format, op_desc, *args)
+
+
+def _swap_step(x: Node, mask: Immediate, shift: int, vl: Node, vm: Node = None, dst: Node = None, tail_policy: TailPolicy = TailPolicy.UNDEFINED, mask_policy: MaskPolicy = MaskPolicy.UNDEFINED) -> Node:
+    """Swap adjacent <shift>-bit fields of x: ((x & mask) << shift) | ((x >> shift) & mask)
+
+    vm/dst/policies are applied to the final vor."""
+    node_format = x.node_format
+    shift_amount = _scalar_constant(node_format.elt_type, shift)
+    lo_shift = _shared_op(node_format, _SLL, _shared_op(node_format, _AND, x, mask, vl), shift_amount, vl)
+    hi_masked = _shared_op(node_format, _AND, _shared_op(node_format, _SRL, x, shift_amount, vl), mask, vl)
+    if vm is None and dst is None and tail_policy == TailPolicy.UNDEFINED and mask_policy == MaskPolicy.UNDEFINED:
+        return _shared_op(node_format, _OR, lo_shift, hi_masked, vl)
+    return _or(lo_shift, hi_masked, vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
+
+
+# (mask pattern, shift) of the swap steps of brev8: nibbles, 2-bit pairs then bits
+BREV8_STEPS = [(0x0F0F0F0F0F0F0F0F, 4), (0x3333333333333333, 2), (0x5555555555555555, 1)]
+# (mask pattern, shift) of the swap steps of rev8: words, half words then bytes
+REV8_STEPS = [(0xffffffff, 32), (0xffff0000ffff, 16), (0xff00ff00ff00ff, 8)]
+
+
+def _swap_steps(op0: Node, steps: list, vl: Node, vm: Node = None, dst: Node = None, tail_policy: TailPolicy = TailPolicy.UNDEFINED, mask_policy: MaskPolicy = MaskPolicy.UNDEFINED) -> Node:
+    """Chain _swap_step over (mask pattern, shift) steps, the last one carries vm/dst/policies"""
+    elt_type = op0.node_format.elt_type
+    for pattern, shift in steps[:-1]:
+        op0 = _swap_step(op0, _elt_mask(elt_type, pattern), shift, vl)
+    pattern, shift = steps[-1]
+    return _swap_step(op0, _elt_mask(elt_type, pattern), shift, vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
 
 
 def brev8(op0: Node, vl: Node, vm: Node = None, dst: Node = None, tail_policy: TailPolicy = TailPolicy.UNDEFINED, mask_policy: MaskPolicy = MaskPolicy.UNDEFINED) -> Node:
     """Generate vector brev8 (bit reverse in bytes) using operation RVV 1.0 operation only."""
-    elt_size = element_size(op0.node_format.elt_type)
-    mask_elt_size = (1 << (elt_size)) - 1
-    mask_4bits = Immediate(get_scalar_format(op0.node_format), 0x0F0F0F0F0F0F0F0F & mask_elt_size)
-    # inversing nimbles in byte
-    op0_lo = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0, mask_4bits, vl)
-    op0_lo_shift = Operation(op0.node_format, OperationDescriptor(OperationType.SLL), op0_lo, Immediate(get_scalar_format(op0.node_format), 4), vl)
-    op0_hi_shift = Operation(op0.node_format, OperationDescriptor(OperationType.SRL), op0, Immediate(get_scalar_format(op0.node_format), 4), vl)
-    op0_hi_masked = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0_hi_shift, mask_4bits, vl)
-    op0_inv_nimbles = Operation(op0.node_format, OperationDescriptor(OperationType.OR), op0_lo_shift, op0_hi_masked, vl)
-    # inversing 2-bit in nimbles
-    mask_2bits = Immediate(get_scalar_format(op0.node_format), 0x3333333333333333 & mask_elt_size)
-    op0_2bits_lo = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0_inv_nimbles, mask_2bits, vl)
-    op0_2bits_lo_shift = Operation(op0.node_format, OperationDescriptor(OperationType.SLL), op0_2bits_lo, Immediate(get_scalar_format(op0.node_format), 2), vl)
-    op0_2bits_hi_shift = Operation(op0.node_format, OperationDescriptor(OperationType.SRL), op0_inv_nimbles, Immediate(get_scalar_format(op0.node_format), 2), vl)
-    op0_2bits_hi_masked = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0_2bits_hi_shift, mask_2bits, vl)
-    op0_inv_2bits = Operation(op0.node_format, OperationDescriptor(OperationType.OR), op0_2bits_lo_shift, op0_2bits_hi_masked, vl)
-    # inversing 1-bit in nimbles
-    mask_1bit = Immediate(get_scalar_format(op0.node_format), 0x5555555555555555 & mask_elt_size)
-    op0_1bit_lo = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0_inv_2bits, mask_1bit, vl)
-    op0_1bit_lo_shift = Operation(op0.node_format, OperationDescriptor(OperationType.SLL), op0_1bit_lo, Immediate(get_scalar_format(op0.node_format), 1), vl)
-    op0_1bit_hi_shift = Operation(op0.node_format, OperationDescriptor(OperationType.SRL), op0_inv_2bits, Immediate(get_scalar_format(op0.node_format), 1), vl)
-    op0_1bit_hi_masked = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0_1bit_hi_shift, mask_1bit, vl)
-    op0_inv_1bit = Operation(op0.node_format, OperationDescriptor(OperationType.OR), op0_1bit_lo_shift, op0_1bit_hi_masked, vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
-    return op0_inv_1bit
+    return _swap_steps(op0, BREV8_STEPS, vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
+
+# bit-reversed value of each 4-bit index, packed as two little-endian 64-bit words
+NIBBLE_REVERSE_LUT = [0x0, 0x8, 0x4, 0xc, 0x2, 0xa, 0x6, 0xe, 0x1, 0x9, 0x5, 0xd, 0x3, 0xb, 0x7, 0xf]
+NIBBLE_REVERSE_LUT_LO = sum(v << (8 * i) for i, v in enumerate(NIBBLE_REVERSE_LUT[:8]))
+NIBBLE_REVERSE_LUT_HI = sum(v << (8 * i) for i, v in enumerate(NIBBLE_REVERSE_LUT[8:]))
+
+
+def nibble_reverse_lut(lmul: LMULType) -> Node:
+    """Byte vector whose 16 first elements are NIBBLE_REVERSE_LUT (vmv.v.x of the
+    low word, then vslideup of the high word into element 1 at SEW=64)
+
+    The 16-byte table must fit in one register group of lmul, i.e. it requires
+    VLEN * LMUL >= 128 (VLEN >= 128 at m1): with VLEN = 64 the high word and
+    the table entries 8 to 15 would be dropped."""
+    u64_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U64, lmul)
+    lut_vl = _vl_constant(2)
+    lut_lo = Operation(u64_fmt, _MV, _scalar_constant(EltType.U64, NIBBLE_REVERSE_LUT_LO), lut_vl)
+    lut_hi = Operation(u64_fmt, _MV, _scalar_constant(EltType.U64, NIBBLE_REVERSE_LUT_HI), lut_vl)
+    lut = Operation(u64_fmt, _SLIDEUP, lut_hi, _scalar_constant(EltType.SIZE_T, 1), lut_vl,
+                    dst=lut_lo, tail_policy=TailPolicy.UNDISTURBED)
+    return expand_reinterpret_cast(lut, NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U8, lmul))
+
+
+def brev8_via_vrgather(op0: Node, vl: Node, vm: Node = None, dst: Node = None, tail_policy: TailPolicy = TailPolicy.UNDEFINED, mask_policy: MaskPolicy = MaskPolicy.UNDEFINED) -> Node:
+    """Generate vector brev8 with a nibble-reverse table lookup:
+    brev8(x) = (lut[x & 0xf] << 4) | lut[x >> 4] on each byte.
+
+    This is the RVV counterpart of the PSHUFB nibble-LUT bit reversal on x86
+    (GFNI gets it in a single vgf2p8affineqb). It uses 9 vector operations
+    (3 of them building the table, loop invariant) instead of 15 for brev8."""
+    elt_size = _elt_size(op0.node_format.elt_type)
+    lmul = op0.node_format.lmul_type
+    u8_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U8, lmul)
+    # the byte operations cover the vl elements of op0
+    vl_bytes = vl if elt_size == 8 else Operation(VL_FMT, _MUL, vl, _vl_constant(elt_size // 8))
+    op0_bytes = expand_reinterpret_cast(op0, u8_fmt)
+    lut = nibble_reverse_lut(lmul)
+    nibble_shift = _scalar_constant(EltType.U8, 4)
+    lo_nibbles = _and(op0_bytes, _scalar_constant(EltType.U8, 0xf), vl_bytes)
+    hi_nibbles = _shr(op0_bytes, nibble_shift, vl_bytes)
+    lo_reversed = Operation(u8_fmt, _RGATHER, lut, lo_nibbles, vl_bytes)
+    hi_reversed = Operation(u8_fmt, _RGATHER, lut, hi_nibbles, vl_bytes)
+    lo_reversed_shift = _shl(lo_reversed, nibble_shift, vl_bytes)
+    # final combination at the source element width, so that vm and policies apply per element
+    return _or(expand_reinterpret_cast(lo_reversed_shift, op0.node_format),
+               expand_reinterpret_cast(hi_reversed, op0.node_format),
+               vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
 
 def rev8(op0: Node, vl: Node, vm: Node = None, dst: Node = None, tail_policy: TailPolicy = TailPolicy.UNDEFINED, mask_policy: MaskPolicy = MaskPolicy.UNDEFINED) -> Node:
     """ Emulate byte reversal in element using only base operations """
-    elt_size = element_size(op0.node_format.elt_type)
-    mask_elt_size = (1 << (elt_size)) - 1
-    # word swap
-    if elt_size > 32:
-        word_mask = Immediate(get_scalar_format(op0.node_format), 0xffffffff & mask_elt_size)
-        op0_lo = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0, word_mask, vl)
-        op0_hi = Operation(op0.node_format, OperationDescriptor(OperationType.SRL), op0, Immediate(get_scalar_format(op0.node_format), 32), vl)
-        op0_lo_shift = Operation(op0.node_format, OperationDescriptor(OperationType.SLL), op0_lo, Immediate(get_scalar_format(op0.node_format), 32), vl)
-        op0_hi_masked = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0_hi, word_mask, vl)
-        op0 = Operation(op0.node_format, OperationDescriptor(OperationType.OR), op0_lo_shift, op0_hi_masked, vl)
-    
-    # half word swap
-    if elt_size > 16:
-        half_word_mask = Immediate(get_scalar_format(op0.node_format), 0xffff0000ffff & mask_elt_size)
-        op0_lo = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0, half_word_mask, vl)
-        op0_hi = Operation(op0.node_format, OperationDescriptor(OperationType.SRL), op0, Immediate(get_scalar_format(op0.node_format), 16), vl)
-        op0_lo_shift = Operation(op0.node_format, OperationDescriptor(OperationType.SLL), op0_lo, Immediate(get_scalar_format(op0.node_format), 16), vl)
-        op0_hi_masked = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0_hi, half_word_mask, vl)
-        op0 = Operation(op0.node_format, OperationDescriptor(OperationType.OR), op0_lo_shift, op0_hi_masked, vl)
-
-    # last byte swap
-    if elt_size > 8:
-        byte_mask = Immediate(get_scalar_format(op0.node_format), 0xff00ff00ff00ff & mask_elt_size)
-        op0_lo = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0, byte_mask, vl)
-        op0_hi = Operation(op0.node_format, OperationDescriptor(OperationType.SRL), op0, Immediate(get_scalar_format(op0.node_format), 8), vl)
-        op0_lo_shift = Operation(op0.node_format, OperationDescriptor(OperationType.SLL), op0_lo, Immediate(get_scalar_format(op0.node_format), 8), vl)
-        op0_hi_masked = Operation(op0.node_format, OperationDescriptor(OperationType.AND), op0_hi, byte_mask, vl)
-        op0 = Operation(op0.node_format, OperationDescriptor(OperationType.OR), op0_lo_shift, op0_hi_masked, vl)
-    # patching the last op (necessarily a vor) for mask and tail support
-    op0.vm = vm
-    op0.dst = dst
-    op0.tail_policy = tail_policy
-    op0.mask_policy = mask_policy
-    return op0
-
-
-def generate_zvkb_emulation(attributes: list[str], prototypes: bool, definitions: bool,
+    elt_size = _elt_size(op0.node_format.elt_type)
+    steps = [(pattern, shift) for pattern, shift in REV8_STEPS if elt_size > shift]
+    if steps:
+        return _swap_steps(op0, steps, vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
+    if dst is None:
+        # byte elements: rev8 is the identity
+        return op0
+    # undisturbed tail or masked-off elements must still be merged from dst
+    return _or(op0, op0, vl, vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
+
+
+# (operation, operand form, emulation builder) of every generated Zvkb intrinsic,
+# operand form is "vv" (vector rhs), "vx" (scalar rhs) or "v" (unary)
+OP_TABLE = [
+    (OperationType.ROR, "vv", rotate_right),
+    (OperationType.ROR, "vx", rotate_right),
+    (OperationType.ROL, "vv", rotate_left),
+    (OperationType.ROL, "vx", rotate_left),
+    (OperationType.ANDN, "vv", and_not),
+    (OperationType.ANDN, "vx", and_not),
+    (OperationType.BREV8, "v", brev8),
+    (OperationType.REV8, "v", rev8),
+]
+
+ALL_OPS = frozenset(op_type for op_type, _, _ in OP_TABLE)
+
+UNSIGNED_ELT_TYPES = [EltType.U8, EltType.U16, EltType.U32, EltType.U64]
+
+
+def lmul_tokens(lmul: LMULType) -> dict:
+    """LMUL-dependent C tokens of the zvkb intrinsics for lmul: vector type,
+    mask type and intrinsic type tag of every unsigned element type"""
+    vec_fmts = [NodeFormatDescriptor(NodeFormatType.VECTOR, elt_type, lmul) for elt_type in UNSIGNED_ELT_TYPES]
+    tokens = {}
+    # vector types first: type tags must not be matched inside vector type names
+    tokens.update((f"vtype_{fmt.elt_type.name}", generate_node_format_type_string(fmt)) for fmt in vec_fmts)
+    tokens.update((f"mtype_{fmt.elt_type.name}", vector_type_to_mask_type(fmt)) for fmt in vec_fmts)
+    tokens.update((f"tag_{fmt.elt_type.name}", generate_intrinsic_type_tag(fmt)) for fmt in vec_fmts)
+    return tokens
+
+
+def to_lmul_template(code: str, tokens: dict) -> str:
+    """Turn code generated for one LMUL into a str.format template over lmul_tokens keys"""
+    code = code.replace("{", "{{").replace("}", "}}")
+    for key, token in tokens.items():
+        code = code.replace(token, "{" + key + "}")
+    return code
+
+
+def zvkb_operands(elt_type: EltType, lmul: LMULType) -> dict:
+    """Input nodes of the zvkb intrinsics of one (type, LMUL): the operands of
+    each operand form ("vv", "vx", "v") plus "vl", "vm" and "vd".
+
+    They are built once and shared by every policy variant, so that the policy
+    independent steps of the emulations are too (see _shared_op)."""
+    uint_t = _scalar_format(elt_type)
+    vuintm_t = NodeFormatDescriptor(NodeFormatType.VECTOR, elt_type, lmul)
+    vbooln_t = NodeFormatDescriptor(NodeFormatType.MASK, elt_type, lmul)
+
+    lhs = Input(vuintm_t, 0)
+    rhs = Input(vuintm_t, 1)
+    rhs_vx = Input(uint_t, 1)
+    return {
+        "vv": (lhs, rhs), "vx": (lhs, rhs_vx), "v": (lhs,),
+        "vl": Input(VL_FMT, 2, name="vl"),
+        "vm": Input(vbooln_t, -2, name="vm"),
+        "vd": Input(vuintm_t, -1, name="vd"),
+    }
+
+
+def render_zvkb_insns(operands: dict, tail_policy: TailPolicy, mask_policy: MaskPolicy,
+                      op_table: list, attributes: list[str], definitions: bool, brev8_lut: bool = False) -> list:
+    """Build and render the op_table intrinsics of one policy configuration
+    over operands (see zvkb_operands).
+
+    Returns a list of (intrinsic name, prototype string, definition string or None)."""
+    vl, vm, vd = operands["vl"], operands["vm"], operands["vd"]
+    vuintm_t = vd.node_format
+
+    dst = vd if tail_policy == TailPolicy.UNDISTURBED or mask_policy == MaskPolicy.UNDISTURBED else None
+    mask = vm if mask_policy != MaskPolicy.UNDEFINED else None
+    policy_kwargs = dict(vm=mask, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
+
+    insns = []
+    for op_type, form, builder in op_table:
+        if brev8_lut and op_type == OperationType.BREV8:
+            builder = brev8_via_vrgather
+        proto = Operation(vuintm_t, OperationDescriptor(op_type), *operands[form], vl, **policy_kwargs)
+        # prototype and definition share a single signature construction
+        emulation = builder(*operands[form], vl, **policy_kwargs) if definitions else None
+        proto_str, def_str = generate_intrinsic_proto_and_def(proto, emulation, attributes)
+        insns.append((generate_intrinsic_name(proto), proto_str, def_str))
+    return insns
+
+
+def generate_zvkb_block(out: TextIO, elt_type: EltType, lmuls: list, tail_policies: list, mask_policies: list,
+                        op_table: list, attributes: list[str], prototypes: bool, definitions: bool,
+                        label_filter: str = None, brev8_lut: bool = False) -> None:
+    """Write every (LMUL, tail policy, mask policy) variant of elt_type to out,
+    each output line is preceded by a newline.
+
+    The emulation sequences only depend on LMUL through type names, so each
+    (tail policy, mask policy) configuration is rendered once, for the first
+    LMUL, and then instantiated for the others as a template."""
+    # (tail policy, mask policy) -> list of templated (name, prototype, definition)
+    templates = {}
+    # only the first LMUL is rendered
+    operands = zvkb_operands(elt_type, lmuls[0]) if lmuls else None
+    for lmul in lmuls:
+        tokens = lmul_tokens(lmul)
+        for tail_policy in tail_policies:
+            for mask_policy in mask_policies:
+                key = (tail_policy, mask_policy)
+                if key not in templates:
+                    templates[key] = [
+                        tuple(None if code is None else to_lmul_template(code, tokens) for code in insn)
+                        for insn in render_zvkb_insns(operands, tail_policy, mask_policy, op_table, attributes, definitions, brev8_lut)
+                    ]
+                zvkb_insns = [tuple(None if code is None else code.format_map(tokens) for code in insn)
+                              for insn in templates[key]]
+                if label_filter is not None:
+                    zvkb_insns = [insn for insn in zvkb_insns if re.search(label_filter, insn[0])]
+                out.write(generate_intrinsic_sections(zvkb_insns, prototypes, definitions))
+
+
+@lru_cache(maxsize=64)
+def _generate_zvkb_block_str(elt_type: EltType, **kwargs) -> str:
+    """generate_zvkb_block into a string (also the process pool worker).
+
+    The generated code only depends on the (hashable) arguments: it is
+    memoized, so repeated configurations reuse the emitted block."""
+    out = io.StringIO()
+    generate_zvkb_block(out, elt_type, **kwargs)
+    return out.getvalue()
+
+
+def generate_zvkb_emulation(attributes: list[str] = None, prototypes: bool = False, definitions: bool = True,
                              lmul_filter: list = None, elt_filter: list = None,
                              tail_policy_filter: list = None, mask_policy_filter: list = None,
-                             label_filter: str = None):
+                             label_filter: str = None, ops: set = ALL_OPS, native_guard: bool = True,
+                             brev8_lut: bool = False, jobs: int = None):
     """Generate all Zvkb rotate instruction emulations.
 
     Args:
+        attributes: list of attributes to add to the generated code, defaults to
+            DEFAULT_ATTRIBUTES (see resolve_attributes)
         lmul_filter: if set, only generate for these LMULType values
         elt_filter: if set, only generate for these EltType values
         tail_policy_filter: if set, only generate for these TailPolicy values
         mask_policy_filter: if set, only generate for these MaskPolicy values
+        ops: OperationType values (from OP_TABLE) to generate, default to all
+        native_guard: enclose the emulation in #if !defined(__riscv_zvkb) so
+            that toolchains with Zvkb support use the native intrinsics
+        brev8_lut: emulate vbrev8 with a vrgather nibble table (brev8_via_vrgather)
+            rather than with three shift/mask swap steps
+        jobs: if greater than 1, generate the element type blocks in a pool of
+            <jobs> processes (output order is unchanged), 0 uses one process per CPU
+
+    The element type blocks are memoized (see _generate_zvkb_block_str), so
+    repeated calls with the same configuration reuse the generated code.
     """
-    output = []
-    
-    vl_type = NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None)
-    vl = Input(vl_type, 2, name="vl")
-
-    output.append("#include <stdint.h>\n")
-    output.append("#include <riscv_vector.h>\n")
-    output.append("#include <stddef.h>\n")
-
-    all_elt_types = [EltType.U8, EltType.U16, EltType.U32, EltType.U64]
+    attributes = resolve_attributes(attributes, prototypes)
+    output = io.StringIO()
+
+    output.write("#include <stdint.h>\n")
+    output.write("\n#include <riscv_vector.h>\n")
+    output.write("\n#include <stddef.h>\n")
+    if native_guard:
+        # emulated intrinsics have the native names: only define them when
+        # the compiler does not already provide Zvkb intrinsics
+        output.write("\n#if !defined(__riscv_zvkb)")
+
+    all_elt_types = UNSIGNED_ELT_TYPES
     all_lmuls = [LMULType.M1, LMULType.M2, LMULType.M4, LMULType.M8]
     all_tail_policies = [TailPolicy.UNDISTURBED, TailPolicy.AGNOSTIC]
     all_mask_policies = [MaskPolicy.UNDISTURBED, MaskPolicy.AGNOSTIC, MaskPolicy.UNMASKED]
@@ -199,155 +400,22 @@ def generate_zvkb_emulation(attributes: list[str], prototypes: bool, definitions
     lmuls = [l for l in all_lmuls if lmul_filter is None or l in lmul_filter]
     tail_policies = [t for t in all_tail_policies if tail_policy_filter is None or t in tail_policy_filter]
     mask_policies = [m for m in all_mask_policies if mask_policy_filter is None or m in mask_policy_filter]
+    op_table = [entry for entry in OP_TABLE if entry[0] in ops]
 
-    for elt_type in elt_types:
-        uint_t = NodeFormatDescriptor(NodeFormatType.SCALAR, elt_type, lmul_type=None)
-        rhs_vx = Input(uint_t, 1)
-        for lmul in lmuls:
-            vuintm_t = NodeFormatDescriptor(NodeFormatType.VECTOR, elt_type, lmul)
-            vbooln_t = NodeFormatDescriptor(NodeFormatType.MASK, elt_type, lmul)
-            
-            lhs = Input(vuintm_t, 0)
-            rhs = Input(vuintm_t, 1)
-            vm = Input(vbooln_t, -2, name="vm")
-            vd = Input(vuintm_t, -1, name="vd")
-
-            for tail_policy in tail_policies:
-                for mask_policy in mask_policies:
-                    dst = vd if tail_policy == TailPolicy.UNDISTURBED or mask_policy == MaskPolicy.UNDISTURBED else None
-                    mask = vm if mask_policy != MaskPolicy.UNDEFINED else None
-
-                    vuintm_vror_vv_prototype = Operation(
-                        vuintm_t,
-                        OperationDescriptor(OperationType.ROR),
-                        lhs,
-                        rhs,
-                        vl,
-                        vm = mask,
-                        tail_policy = tail_policy,
-                        mask_policy = mask_policy,
-                        dst = dst
-                    )
-
-                    vuintm_vror_vv_emulation = rotate_right(lhs, rhs, vl, vm=mask, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
-
-                    vuintm_vror_vx_prototype = Operation(
-                        vuintm_t,
-                        OperationDescriptor(OperationType.ROR),
-                        lhs,
-                        rhs_vx,
-                        vl,
-                        vm = mask,
-                        tail_policy = tail_policy,
-                        mask_policy = mask_policy,
-                        dst = dst
-                    )
-                    vuintm_vror_vx_emulation = rotate_right(lhs, rhs_vx, vl, vm=mask, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
-
-                    vuintm_vrol_vv_prototype = Operation(
-                        vuintm_t,
-                        OperationDescriptor(OperationType.ROL),
-                        lhs,
-                        rhs,
-                        vl,
-                        vm = mask,
-                        tail_policy = tail_policy,
-                        mask_policy = mask_policy,
-                        dst = dst
-                    )
-                    vuintm_vrol_vv_emulation = rotate_left(lhs, rhs, vl, vm=mask, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
-
-                    vuintm_vrol_vx_prototype = Operation(
-                        vuintm_t,
-                        OperationDescriptor(OperationType.ROL),
-                        lhs,
-                        rhs_vx,
-                        vl,
-                        vm = mask,
-                        tail_policy = tail_policy,
-                        mask_policy = mask_policy,
-                        dst = dst
-                    )
-                    vuintm_vrol_vx_emulation = rotate_left(lhs, rhs_vx, vl, vm=mask, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
-
-                    vuintm_vandn_vv_prototype = Operation(
-                        vuintm_t,
-                        OperationDescriptor(OperationType.ANDN),
-                        lhs,
-                        rhs,
-                        vl,
-                        vm = mask,
-                        tail_policy = tail_policy,
-                        mask_policy = mask_policy,
-                        dst = dst
-                    )
-                    vuintm_vandn_vv_emulation = and_not(lhs, rhs, vl, vm=mask, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
-
-                    vuintm_vandn_vx_prototype = Operation(
-                        vuintm_t,
-                        OperationDescriptor(OperationType.ANDN),
-                        lhs,
-                        rhs_vx,
-                        vl,
-                        vm = mask,
-                        tail_policy = tail_policy,
-                        mask_policy = mask_policy,
-                        dst = dst
-                    )
-                    vuintm_vandn_vx_emulation = and_not(lhs, rhs_vx, vl, vm=mask, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
-
-                    vuintm_brev8_v_prototype = Operation(
-                        vuintm_t,
-                        OperationDescriptor(OperationType.BREV8),
-                        lhs,
-                        vl,
-                        vm = mask,
-                        tail_policy = tail_policy,
-                        mask_policy = mask_policy,
-                        dst = dst
-                    )
-                    vuintm_brev8_v_emulation = brev8(lhs, vl, vm=mask, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
-
-                    vuintm_rev8_v_prototype = Operation(
-                        vuintm_t,
-                        OperationDescriptor(OperationType.REV8),
-                        lhs,
-                        vl,
-                        vm = mask,
-                        tail_policy = tail_policy,
-                        mask_policy = mask_policy,
-                        dst = dst
-                    )
-                    vuintm_rev8_v_emulation = rev8(lhs, vl, vm=mask, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
-
-                            
-
-                    zvkb_insns = [
-                        (vuintm_vror_vv_prototype, vuintm_vror_vv_emulation),
-                        (vuintm_vror_vx_prototype, vuintm_vror_vx_emulation),
-                        (vuintm_vrol_vv_prototype, vuintm_vrol_vv_emulation),
-                        (vuintm_vrol_vx_prototype, vuintm_vrol_vx_emulation),
-                        (vuintm_vandn_vv_prototype, vuintm_vandn_vv_emulation),
-                        (vuintm_vandn_vx_prototype, vuintm_vandn_vx_emulation),
-                        (vuintm_brev8_v_prototype, vuintm_brev8_v_emulation),
-                        (vuintm_rev8_v_prototype, vuintm_rev8_v_emulation)
-                    ]
+    block_kwargs = dict(lmuls=tuple(lmuls), tail_policies=tuple(tail_policies), mask_policies=tuple(mask_policies),
+                        op_table=tuple(op_table), attributes=tuple(attributes), prototypes=prototypes,
+                        definitions=definitions, label_filter=label_filter, brev8_lut=brev8_lut)
+    # element type blocks are independent: only enums, strings and
+    # module-level builders cross the process boundary
+    for block in generate_blocks(_generate_zvkb_block_str, elt_types, jobs, **block_kwargs):
+        output.write(block)
 
-                    if label_filter is not None:
-                        zvkb_insns = [(p, e) for p, e in zvkb_insns if re.search(label_filter, generate_intrinsic_name(p))]
-                    if prototypes:
-                        output.append("// prototypes")
-                        for prototype in [p for p, e in zvkb_insns]:
-                            output.append(generate_intrinsic_prototype(prototype))
-                    if definitions:
-                        output.append("\n// intrinsics")
-                        for prototype, emulation in zvkb_insns:
-                            output.append(generate_intrinsic_from_operation(prototype, emulation, attributes=attributes))
-    
-    return "\n".join(output)
+    if native_guard:
+        output.write("\n#endif /* !defined(__riscv_zvkb) */")
+    return output.getvalue()
 
 
-def main(attributes: list[str], prototypes: bool, definitions: bool):
+def main(attributes: list[str] = None, prototypes: bool = False, definitions: bool = True):
     """CLI entry point for generating Zvkb emulation code."""
     print(generate_zvkb_emulation(attributes, prototypes, definitions))
 
@@ -356,7 +424,7 @@ if __name__ == "__main__":
     # extract attributes from command line arguments
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument("-a", "--attributes", nargs="+", default=[], help="Attributes to add to the generated code")
+    parser.add_argument("-a", "--attributes", nargs="+", default=None, help="Attributes to add to the generated code (default: static inline always_inline)")
     parser.add_argument("-p", "--prototypes", default=False, action="store_true", help="generate prototypes")
     parser.add_argument("--no-definitions", default=False, action="store_true", help="do not generate definitions")
     args = parser.parse_args()
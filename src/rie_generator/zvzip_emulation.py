@@ -7,6 +7,12 @@ This module generates C code for emulating RISC-V Zvzip vector
 instructions using standard RVV 1.0 intrinsics.
 """
 
+import io
+import sys
+from functools import lru_cache, partial
+from itertools import product
+from typing import Callable, TextIO
+
 from .core import (
     Operation,
     OperationDescriptor,
@@ -19,307 +25,441 @@ from .core import (
     EltType,
     LMULType,
     OperationType,
+    generate_blocks,
     generate_intrinsic_name,
-    generate_intrinsic_prototype,
-    generate_intrinsic_from_operation,
+    generate_intrinsic_proto_and_def,
+    generate_intrinsic_sections,
+    expand_reinterpret_cast,
     TailPolicy,
     MaskPolicy,
+    resolve_attributes,
 )
 
-from .description_helper import get_vlenb
+from .description_helper import get_vlenb, get_vlmax
+
+
+@lru_cache(maxsize=None)
+def _fmt(node_format_type: NodeFormatType, elt_type: EltType, lmul_type: LMULType = None) -> NodeFormatDescriptor:
+    """Shared NodeFormatDescriptor for a (format type, element type, LMUL) key,
+    descriptors are never mutated once built"""
+    return NodeFormatDescriptor(node_format_type, elt_type, lmul_type)
+
+
+@lru_cache(maxsize=None)
+def _op(op_type: OperationType) -> OperationDescriptor:
+    """Shared OperationDescriptor for <op_type>"""
+    return OperationDescriptor(op_type)
+
+
+@lru_cache(maxsize=None)
+def _imm(node_format: NodeFormatDescriptor, value: int) -> Immediate:
+    """Shared immediate of format <node_format>"""
+    return Immediate(node_format, value)
+
+
+# widest supported element size: SEW = ELEN vectors cannot be widened to
+# interleave/deinterleave and need dedicated sequences
+ELEN = 64
+
+VL_FMT = _fmt(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T)
+SCALAR_U8_FMT = _fmt(NodeFormatType.SCALAR, EltType.U8)
+SCALAR_SIZE_T_FMT = _fmt(NodeFormatType.SCALAR, EltType.SIZE_T)
+VECTOR_U8M1_FMT = _fmt(NodeFormatType.VECTOR, EltType.U8, LMULType.M1)
+
+# vl scaling factors for the widened (2 * vl) and byte-mask (4 * vl) views
+VL_FACTOR_2 = _imm(VL_FMT, 2)
+VL_FACTOR_4 = _imm(VL_FMT, 4)
+
+
+# bounded like the *_operands caches: each block builds its own vl input, so
+# entries are only ever reused within a block and old ones can be evicted
+@lru_cache(maxsize=1024)
+def scaled_vl(vl: Node, factor: Immediate) -> Operation:
+    """<factor> * <vl>, shared by every emulation of a block built on the same vl"""
+    return Operation(VL_FMT, _op(OperationType.MUL), vl, factor)
+
+def periodic_mask_byte(period: int, *lanes: int) -> int:
+    """Byte whose bit i is set when i % period is one of <lanes>, i.e. the
+    mask byte selecting those lanes out of every group of <period> elements"""
+    return sum(1 << bit for bit in range(8) if bit % period in lanes)
+
+
+# mask bytes used by the emulations (computed once at import time)
+EVEN_LANES = periodic_mask_byte(2, 0)             # 0x55
+ODD_LANES = periodic_mask_byte(2, 1)              # 0xAA
+MIDDLE_OF_4_LANES = periodic_mask_byte(4, 1, 2)   # 0x66
+LANE_2_OF_4 = periodic_mask_byte(4, 2)            # 0x44
+LANE_3_OF_4 = periodic_mask_byte(4, 3)            # 0x88
+
+
+# VLEN in bytes: vl of the vuint8m1_t byte splats
+VLENB = get_vlenb()
+
+
+@lru_cache(maxsize=None)
+def byte_splat(pattern: int) -> Operation:
+    """vuint8m1_t whose bytes all equal <pattern> (a single vmv.v.x), shared
+    by the masks of every format built from the same pattern"""
+    # The pattern must cover all VLENB bytes (a mask of a 2*LMUL group reads
+    # up to VLEN bits): a splat from a scalar register needs no memory access,
+    # while loading it from a constant pool would require a VLENB-byte table.
+    return Operation(
+        VECTOR_U8M1_FMT,
+        _op(OperationType.MV),
+        _imm(SCALAR_U8_FMT, pattern),
+        VLENB,
+    )
+
+
+@lru_cache(maxsize=None)
+def byte_pattern_mask(pattern: int, elt_type: EltType, lmul: LMULType) -> Operation:
+    """Mask of format (elt_type, lmul) whose bytes all equal <pattern>.
+
+    The byte splat is reinterpreted as a mask; the node is shared by every
+    emulation using the same (pattern, mask format)."""
+    return Operation(
+        _fmt(NodeFormatType.MASK, elt_type, lmul),
+        _op(OperationType.REINTERPRET),
+        byte_splat(pattern),
+    )
+
+
+# (tail policy, mask policy) -> whether a policy independent result needs a
+# final policy-carrying operation (anything but unmasked and tail agnostic)
+NEEDS_POLICY_OPERATION = {
+    (tail_policy, mask_policy): not (tail_policy == TailPolicy.AGNOSTIC and mask_policy == MaskPolicy.UNMASKED)
+    for tail_policy in TailPolicy for mask_policy in MaskPolicy
+}
+
+
+def apply_policies(result: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Node:
+    """Apply mask and tail policies to the policy independent <result> with a
+    final vor.vx of 0, <result> is returned as is when unmasked and tail agnostic"""
+    if not NEEDS_POLICY_OPERATION[(tail_policy, mask_policy)]:
+        return result
+    return Operation(
+        result.node_format,
+        _op(OperationType.OR),
+        result,
+        _imm(_fmt(NodeFormatType.SCALAR, result.node_format.elt_type), 0),
+        vl,
+        vm=vm,
+        dst=vd,
+        tail_policy=tail_policy,
+        mask_policy=mask_policy,
+    )
 
 
 # ---------------------------------------------------------------------------
 # Emulation building blocks
 # ---------------------------------------------------------------------------
 
-def vzip_emulation(vs1: Node, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
-    # if SEW < ELEN and Zvkb is supported, we could use widening shift operations
+def select_vzip_emulation(elt_type: EltType, elen_slides: bool = False, has_zvbb: bool = False) -> Callable:
+    """Return the vzip emulation builder for element type <elt_type>, so that
+    generators can resolve it once per element type rather than per variant"""
     # No need to support LMUL=8 inputs (since vzip does not support it, as destination EMUL would exceed 8)
-    # TODO: support SEW = ELEN
-    elen = 64
-    if element_size(vs1.node_format.elt_type) == elen:
-        return vzip_emulation_elen(vs1, vs2, vl, vm, vd, tail_policy, mask_policy)
-    else:
-        return vzip_emulation_non_elen(vs1, vs2, vl, vm, vd, tail_policy, mask_policy)
+    if element_size(elt_type) == ELEN:
+        return VZIP_ELEN_EMULATIONS[elen_slides]
+    return VZIP_NON_ELEN_EMULATIONS[has_zvbb]
 
-def vzip_emulation_elen(vs1: Node, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
-    """Emulate vzip when SEW = ELEN using base RVV 1.0 operations."""
+
+def vzip_emulation(vs1: Node, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy,
+                   elen_slides: bool = False, has_zvbb: bool = False) -> Operation:
+    emulation = select_vzip_emulation(vs1.node_format.elt_type, elen_slides=elen_slides, has_zvbb=has_zvbb)
+    return emulation(vs1, vs2, vl, vm, vd, tail_policy, mask_policy)
+
+@lru_cache(maxsize=1024)
+def vzip_elen_operands(vs1: Node, vs2: Node, vl: Node) -> tuple:
+    """Policy independent part of the SEW = ELEN vzip emulation, shared by all
+    tail/mask policy variants built on the same inputs.
+
+    Returns the (interleaved result, 2 * vl) pair"""
     narrowed_elt_type = EltType.narrow(vs1.node_format.elt_type)
     widened_lmul = LMULType.multiply(vs1.node_format.lmul_type, 2)
-    fmt_narrow_elt = NodeFormatDescriptor(NodeFormatType.VECTOR, narrowed_elt_type, vs1.node_format.lmul_type)
-    widened_fmt_narrow_elt = NodeFormatDescriptor(NodeFormatType.VECTOR, narrowed_elt_type, widened_lmul)
-    widened_fmt_std_elt = NodeFormatDescriptor(NodeFormatType.VECTOR, vs1.node_format.elt_type, widened_lmul)
+    fmt_narrow_elt = _fmt(NodeFormatType.VECTOR, narrowed_elt_type, vs1.node_format.lmul_type)
+    widened_fmt_narrow_elt = _fmt(NodeFormatType.VECTOR, narrowed_elt_type, widened_lmul)
+    widened_fmt_std_elt = _fmt(NodeFormatType.VECTOR, vs1.node_format.elt_type, widened_lmul)
     # destination format (EMUL=2*LMUL, EEW=SEW)
     vd_fmt = widened_fmt_std_elt
-    twice_vl = Operation(
-        NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None),
-        OperationDescriptor(OperationType.MUL),
-        vl,
-        Immediate(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None), 2),
-    )
-    four_vl = Operation(
-        NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None),
-        OperationDescriptor(OperationType.MUL),
-        vl,
-        Immediate(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None), 4),
-    )
-    vs2_narrow_casted = Operation(
-        fmt_narrow_elt,
-        OperationDescriptor(OperationType.REINTERPRET),
-        vs2,
-    )
-    vs1_narrow_casted = Operation(
-        fmt_narrow_elt,
-        OperationDescriptor(OperationType.REINTERPRET),
-        vs1,
-    )
+    twice_vl = scaled_vl(vl, VL_FACTOR_2)
+    four_vl = scaled_vl(vl, VL_FACTOR_4)
+
+    def spread_halves(src: Node) -> Node:
+        # each SEW/2 half of src is zero-extended into its own SEW element
+        src_extended = Operation(
+            widened_fmt_std_elt,
+            _op(OperationType.ZEXT_VF2),
+            expand_reinterpret_cast(src, fmt_narrow_elt),
+            twice_vl,
+        )
+        return expand_reinterpret_cast(src_extended, widened_fmt_narrow_elt)
 
-    vs2_extended = Operation(
-        widened_fmt_std_elt,
-        OperationDescriptor(OperationType.ZEXT_VF2),
-        vs2_narrow_casted,
-        twice_vl,
-    )
-    vs2_casted_std_elt = Operation(
-        widened_fmt_narrow_elt,
-        OperationDescriptor(OperationType.REINTERPRET),
-        vs2_extended,
-    )
+    vs2_casted_std_elt = spread_halves(vs2)
     # build mask/
-    vlenb = get_vlenb()
-
-    vm_vs2_slide_pre_cast = Operation(
-        NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U8, LMULType.M1),
-        OperationDescriptor(OperationType.MV),
-        Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.U8, None), 0x66),
-        vlenb,
-    )
-    vm_vs2_slide = Operation(
-        NodeFormatDescriptor(NodeFormatType.MASK, widened_fmt_narrow_elt.elt_type, widened_fmt_narrow_elt.lmul_type),
-        OperationDescriptor(OperationType.REINTERPRET),
-        vm_vs2_slide_pre_cast,
-    )
+    # All three slides run at the same (SEW/2, 2*LMUL, 4*vl) with the same
+    # (tail agnostic, mask undisturbed) policy: the undisturbed mask policy is what
+    # merges the slid lanes into their destination, and sharing the vtype lets the
+    # compiler keep a single vsetvli for the whole slide sequence.
+    vm_vs2_slide = byte_pattern_mask(MIDDLE_OF_4_LANES, narrowed_elt_type, widened_lmul)
     vs2_slided = Operation(
         widened_fmt_narrow_elt,
-        OperationDescriptor(OperationType.SLIDEDOWN),
+        _op(OperationType.SLIDEDOWN),
         vs2_casted_std_elt,
-        Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, narrowed_elt_type, None), 1),
+        _imm(_fmt(NodeFormatType.SCALAR, narrowed_elt_type), 1),
         four_vl,
         vm=vm_vs2_slide,
         mask_policy=MaskPolicy.UNDISTURBED,
         tail_policy=TailPolicy.AGNOSTIC,
         dst=vs2_casted_std_elt
     )
-    vs2_result_casted = Operation(
-        vd_fmt,
-        OperationDescriptor(OperationType.REINTERPRET),
-        vs2_slided,
-    )
 
-    vs1_extended = Operation(
-        widened_fmt_std_elt,
-        OperationDescriptor(OperationType.ZEXT_VF2),
-        vs1_narrow_casted,
-        twice_vl,
-    )
-    vs1_casted_std_elt = Operation(
-        widened_fmt_narrow_elt,
-        OperationDescriptor(OperationType.REINTERPRET),
-        vs1_extended,
-    )
-    vm_vs1_hi_slide_pre_cast = Operation(
-        NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U8, LMULType.M1),
-        OperationDescriptor(OperationType.MV),
-        Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.U8, None), 0x88),
-        vlenb,
-    )
-    vm_vs1_lo_slide_pre_cast = Operation(
-        NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U8, LMULType.M1),
-        OperationDescriptor(OperationType.MV),
-        Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.U8, None), 0x44),
-        vlenb,
-    )
-    vm_vs1_hi_slide = Operation(
-        NodeFormatDescriptor(NodeFormatType.MASK, widened_fmt_narrow_elt.elt_type, widened_fmt_narrow_elt.lmul_type),
-        OperationDescriptor(OperationType.REINTERPRET),
-        vm_vs1_hi_slide_pre_cast,
-    )
-    vm_vs1_lo_slide = Operation(
-        NodeFormatDescriptor(NodeFormatType.MASK, widened_fmt_narrow_elt.elt_type, widened_fmt_narrow_elt.lmul_type),
-        OperationDescriptor(OperationType.REINTERPRET),
-        vm_vs1_lo_slide_pre_cast,
-    )
+    # vs1 halves are slid into the lanes 2 and 3 (of each group of 4) of the
+    # vs2 result: the spread vs1 holds its own low half in lane 0, it cannot
+    # be OR-ed with the vs2 lanes
+    vs1_casted_std_elt = spread_halves(vs1)
+    vm_vs1_hi_slide = byte_pattern_mask(LANE_3_OF_4, narrowed_elt_type, widened_lmul)
+    vm_vs1_lo_slide = byte_pattern_mask(LANE_2_OF_4, narrowed_elt_type, widened_lmul)
     vs1_hi_slided = Operation(
         widened_fmt_narrow_elt,
-        OperationDescriptor(OperationType.SLIDEUP),
-        # no need for extra vd argument here since undisturbed mask policy is used (vd already provided)
+        _op(OperationType.SLIDEUP),
         vs1_casted_std_elt,
-        Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, narrowed_elt_type, None), 1),
+        _imm(_fmt(NodeFormatType.SCALAR, narrowed_elt_type), 1),
         four_vl,
         vm=vm_vs1_hi_slide,
         mask_policy=MaskPolicy.UNDISTURBED,
         tail_policy=TailPolicy.AGNOSTIC,
-        dst=vs1_casted_std_elt
+        dst=vs2_slided
     )
     vs1_lo_slided = Operation(
         widened_fmt_narrow_elt,
-        OperationDescriptor(OperationType.SLIDEUP),
+        _op(OperationType.SLIDEUP),
         vs1_casted_std_elt,
-        Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, narrowed_elt_type, None), 2),
+        _imm(_fmt(NodeFormatType.SCALAR, narrowed_elt_type), 2),
         four_vl,
         vm=vm_vs1_lo_slide,
         mask_policy=MaskPolicy.UNDISTURBED,
         tail_policy=TailPolicy.AGNOSTIC,
         dst=vs1_hi_slided
     )
-    vs1_result_casted = Operation(
-        vd_fmt,
-        OperationDescriptor(OperationType.REINTERPRET),
-        vs1_lo_slided,
-    )
-    # combining vs2 and vs1_lo_slided
-    result = Operation(
-        vd_fmt,
-        OperationDescriptor(OperationType.OR),
-        vs2_result_casted,
-        vs1_result_casted,
-        twice_vl,
-        vm=vm,
-        dst=vd,
-        tail_policy=tail_policy,
-        mask_policy=mask_policy,
-    )
-    return result
+    return expand_reinterpret_cast(vs1_lo_slided, vd_fmt), twice_vl
+
+
+def vzip_emulation_elen(vs1: Node, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
+    """Emulate vzip when SEW = ELEN using base RVV 1.0 operations (masked slides).
+
+    The widen-shift-or sequence of SEW < ELEN does not apply: a pair of ELEN
+    elements has no 2*ELEN element view. Each source is instead spread over
+    SEW/2 lanes and slid into place, see vzip_emulation_elen_rgather for the
+    default single gather."""
+    interleaved, twice_vl = vzip_elen_operands(vs1, vs2, vl)
+    return apply_policies(interleaved, twice_vl, vm, vd, tail_policy, mask_policy)
 
     
 
-def vzip_emulation_non_elen(vs1: Node, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
-    """Emulate vzip when SEW < ELEN using base RVV 1.0 operations."""
-    widened_elt_type = EltType.widen(vs1.node_format.elt_type)
-    widened_lmul = LMULType.multiply(vs1.node_format.lmul_type, 2)
-    widened_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, widened_elt_type, widened_lmul)
-    vd_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, vs1.node_format.elt_type, widened_lmul)
-    twice_vl = Operation(
-        NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None),
-        OperationDescriptor(OperationType.MUL),
-        vl,
-        Immediate(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None), 2),
-    )
-    vs2_widened = Operation(
-        widened_fmt,
-        OperationDescriptor(OperationType.ZEXT_VF2),
-        vs2,
+@lru_cache(maxsize=1024)
+def vzip_rgather_operands(vs1: Node, vs2: Node, vl: Node) -> tuple:
+    """Policy independent part of the vrgatherei16 based vzip emulation.
+
+    Returns the (vs2:vs1 register group, gather indices, 2 * vl) operands of
+    the final vrgatherei16"""
+    elt_type = vs1.node_format.elt_type
+    lmul = vs1.node_format.lmul_type
+    widened_lmul = LMULType.multiply(lmul, 2)
+    vd_fmt = _fmt(NodeFormatType.VECTOR, elt_type, widened_lmul)
+    # 16-bit indices: same element count as the destination with a 4x smaller register group
+    index_fmt = _fmt(NodeFormatType.VECTOR, EltType.U16, LMULType.divide(widened_lmul, element_size(elt_type) // 16))
+    twice_vl = scaled_vl(vl, VL_FACTOR_2)
+    # vs2 occupies the low half of the group and vs1 the high half,
+    # starting at element VLMAX(SEW, LMUL)
+    group = Operation(vd_fmt, _op(OperationType.CREATE), vs2, vs1)
+    element_index = Operation(index_fmt, _op(OperationType.VID), twice_vl)
+    half_index = Operation(
+        index_fmt,
+        _op(OperationType.SRL),
+        element_index,
+        _imm(SCALAR_SIZE_T_FMT, 1),
         twice_vl,
     )
-    vs1_widened = Operation(
-        widened_fmt,
-        OperationDescriptor(OperationType.ZEXT_VF2),
-        vs1,
-        vl,
-    )
-    # vs1 also need to be shifted to odd positions
-    vs1_shifted = Operation(
-        widened_fmt,
-        OperationDescriptor(OperationType.SLL),
-        vs1_widened,
-        Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, widened_elt_type, None), element_size(vs1.node_format.elt_type)),
-        vl,
-    )
-    vs2_casted = Operation(
-        vd_fmt,
-        OperationDescriptor(OperationType.REINTERPRET),
-        vs2_widened,
-    )
-    vs1_casted = Operation(
-        vd_fmt,
-        OperationDescriptor(OperationType.REINTERPRET),
-        vs1_shifted,
+    vlmax = Operation(
+        _fmt(NodeFormatType.SCALAR, EltType.U16),
+        _op(OperationType.REINTERPRET),
+        get_vlmax(elt_type, lmul),
+    )
+    # odd destination elements read vs1[i / 2], i.e. group[VLMAX + i / 2]
+    gather_index = Operation(
+        index_fmt,
+        _op(OperationType.ADD),
+        half_index,
+        vlmax,
+        twice_vl,
+        vm=byte_pattern_mask(ODD_LANES, EltType.U16, index_fmt.lmul_type),
+        dst=half_index,
+        tail_policy=TailPolicy.AGNOSTIC,
+        mask_policy=MaskPolicy.UNDISTURBED,
     )
-    result = Operation(
-        vd_fmt,
-        OperationDescriptor(OperationType.OR),
-        vs2_casted,
-        vs1_casted,
+    return group, gather_index, twice_vl
+
+
+def vzip_emulation_elen_rgather(vs1: Node, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
+    """Emulate vzip when SEW = ELEN with a single vrgatherei16.vv over the
+    concatenation of both sources."""
+    group, gather_index, twice_vl = vzip_rgather_operands(vs1, vs2, vl)
+    return Operation(
+        group.node_format,
+        _op(OperationType.RGATHEREI16),
+        group,
+        gather_index,
         twice_vl,
         vm=vm,
         dst=vd,
         tail_policy=tail_policy,
         mask_policy=mask_policy,
     )
-    return result
 
-def vunzip_emulation(extractEven: bool, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
-    """Emulate vunzip (when SEW = ELEN) using base RVV 1.0 operations."""
+
+@lru_cache(maxsize=1024)
+def vunzip_extract(extractEven: bool, vs2: Node, vl: Node) -> Operation:
+    """Policy independent (unmasked, tail agnostic) vcompress based vunzip extraction"""
     narrowed_lmul = LMULType.divide(vs2.node_format.lmul_type, 2)
-    vd_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, vs2.node_format.elt_type, narrowed_lmul)
+    vd_fmt = _fmt(NodeFormatType.VECTOR, vs2.node_format.elt_type, narrowed_lmul)
     # even if the destination format as half the LMUL value of the sources (a), we need to keep the source LMUL when
     # emulating with a vcompress since 2*VL elements might be accessed from the source.
     #
     # Note (a): actually destination has EMUL=LMUL, and source has EMUL=2*LMUL
-    vlenb = get_vlenb()
     # building mask for vcompress
-    vm_extract = Operation(
-        NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U8, LMULType.M1),
-        OperationDescriptor(OperationType.MV),
-        Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.U8, None), 0x55 if extractEven else 0xAA),
-        vlenb,
-    )
-    vm_extract_cast = Operation(
-        NodeFormatDescriptor(NodeFormatType.MASK, vs2.node_format.elt_type, vs2.node_format.lmul_type),
-        OperationDescriptor(OperationType.REINTERPRET),
-        vm_extract,
-    )
+    vm_extract_cast = byte_pattern_mask(EVEN_LANES if extractEven else ODD_LANES, vs2.node_format.elt_type, vs2.node_format.lmul_type)
+    # the 2 * vl source elements are compressed into vl destination elements
+    twice_vl = scaled_vl(vl, VL_FACTOR_2)
     vd_raw = Operation(
         vs2.node_format,
-        OperationDescriptor(OperationType.COMPRESS),
+        _op(OperationType.COMPRESS),
         vs2,
         vm_extract_cast,
-        vl,
+        twice_vl,
         dst=None, 
         tail_policy=TailPolicy.AGNOSTIC,
         mask_policy=MaskPolicy.UNMASKED,
     )
-    idx_fmt = NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.SIZE_T, None)
-    result_unmasked = Operation(vd_fmt, OperationDescriptor(OperationType.GET), vd_raw, Immediate(idx_fmt, 0))
-    # implementing masking
-    if mask_policy == MaskPolicy.UNMASKED and tail_policy == TailPolicy.AGNOSTIC:
-        return result_unmasked
+    idx_fmt = SCALAR_SIZE_T_FMT
+    return Operation(vd_fmt, _op(OperationType.GET), vd_raw, _imm(idx_fmt, 0))
+
+
+@lru_cache(maxsize=1024)
+def vzip_widening_add_operands(vs1: Node, vs2: Node, vl: Node, has_zvbb: bool) -> tuple:
+    """Policy independent part of the SEW < ELEN vzip emulation.
+
+    Returns the (interleaved result, 2 * vl) pair, the result being built as
+    vwaddu.wv(vs1 << SEW, vs2) on 2*SEW elements and reinterpreted to the
+    destination format"""
+    widened_elt_type = EltType.widen(vs1.node_format.elt_type)
+    widened_lmul = LMULType.multiply(vs1.node_format.lmul_type, 2)
+    widened_fmt = _fmt(NodeFormatType.VECTOR, widened_elt_type, widened_lmul)
+    vd_fmt = _fmt(NodeFormatType.VECTOR, vs1.node_format.elt_type, widened_lmul)
+    twice_vl = scaled_vl(vl, VL_FACTOR_2)
+    # vs1 lands in the odd (upper) half of each widened element
+    if has_zvbb:
+        vs1_shifted = Operation(
+            widened_fmt,
+            _op(OperationType.WSLL),
+            vs1,
+            _imm(SCALAR_SIZE_T_FMT, element_size(vs1.node_format.elt_type)),
+            vl,
+        )
     else:
-        return Operation(
-            vd_fmt,
-            OperationDescriptor(OperationType.OR),
-            result_unmasked,
-            Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, vd_fmt.elt_type, None), 0),
+        vs1_widened = Operation(
+            widened_fmt,
+            _op(OperationType.ZEXT_VF2),
+            vs1,
+            vl,
+        )
+        vs1_shifted = Operation(
+            widened_fmt,
+            _op(OperationType.SLL),
+            vs1_widened,
+            _imm(_fmt(NodeFormatType.SCALAR, widened_elt_type), element_size(vs1.node_format.elt_type)),
             vl,
-            vm=vm,
-            dst=vd,
-            tail_policy=tail_policy,
-            mask_policy=mask_policy,
         )
+    # widening add zero-extends vs2 into the even (lower) half
+    combined = Operation(
+        widened_fmt,
+        _op(OperationType.WADDU),
+        vs1_shifted,
+        vs2,
+        vl,
+    )
+    combined_casted = expand_reinterpret_cast(combined, vd_fmt)
+    return combined_casted, twice_vl
 
 
-def vpair_emulation(pairEven: bool, vs1: Node, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
-    vm_merge_mask_pre_cast = Operation(
-        NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U8, LMULType.M1),
-        OperationDescriptor(OperationType.MV),
-        Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.U8, None), 0x55 if pairEven else 0xAA),
-        get_vlenb(),
-    )
-    vm_merge_mask = Operation(
-        NodeFormatDescriptor(NodeFormatType.MASK, vs2.node_format.elt_type, vs2.node_format.lmul_type),
-        OperationDescriptor(OperationType.REINTERPRET),
-        vm_merge_mask_pre_cast,
+def vzip_emulation_widening_add(vs1: Node, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy,
+                                has_zvbb: bool) -> Operation:
+    combined_casted, twice_vl = vzip_widening_add_operands(vs1, vs2, vl, has_zvbb)
+    # mask and policies apply per SEW-wide destination element, the widening
+    # operations work on 2*SEW elements and cannot carry them
+    return apply_policies(combined_casted, twice_vl, vm, vd, tail_policy, mask_policy)
+
+
+def vzip_emulation_non_elen(vs1: Node, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
+    """Emulate vzip when SEW < ELEN using base RVV 1.0 operations."""
+    return vzip_emulation_widening_add(vs1, vs2, vl, vm, vd, tail_policy, mask_policy, has_zvbb=False)
+
+
+def vzip_emulation_zvbb(vs1: Node, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
+    """Emulate vzip when SEW < ELEN using Zvbb vwsll and a widening add."""
+    return vzip_emulation_widening_add(vs1, vs2, vl, vm, vd, tail_policy, mask_policy, has_zvbb=True)
+
+
+def select_vunzip_emulation(elt_type: EltType) -> Callable:
+    """Return the vunzip emulation builder for element type <elt_type>"""
+    return VUNZIP_EMULATIONS[element_size(elt_type)]
+
+
+def vunzip_emulation(extractEven: bool, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
+    emulation = select_vunzip_emulation(vs2.node_format.elt_type)
+    return emulation(extractEven, vs2, vl, vm, vd, tail_policy, mask_policy)
+
+
+def vunzip_emulation_non_elen(extractEven: bool, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
+    """Emulate vunzip when SEW < ELEN with a single narrowing shift: each pair of
+    SEW-bit source elements is viewed as one 2*SEW-bit element whose low (even)
+    or high (odd) half is extracted by vnsrl."""
+    elt_type = vs2.node_format.elt_type
+    narrowed_lmul = LMULType.divide(vs2.node_format.lmul_type, 2)
+    vs2_pairs = expand_reinterpret_cast(vs2, _fmt(NodeFormatType.VECTOR, EltType.widen(elt_type), vs2.node_format.lmul_type))
+    return Operation(
+        _fmt(NodeFormatType.VECTOR, elt_type, narrowed_lmul),
+        _op(OperationType.NSRL),
+        vs2_pairs,
+        _imm(SCALAR_SIZE_T_FMT, 0 if extractEven else element_size(elt_type)),
+        vl,
+        vm=vm,
+        dst=vd,
+        tail_policy=tail_policy,
+        mask_policy=mask_policy,
     )
+
+
+def vunzip_emulation_elen(extractEven: bool, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
+    """Emulate vunzip when SEW = ELEN using vcompress."""
+    # vcompress cannot be masked: masking is applied on the extracted elements
+    return apply_policies(vunzip_extract(extractEven, vs2, vl), vl, vm, vd, tail_policy, mask_policy)
+
+
+@lru_cache(maxsize=1024)
+def vpair_operands(pairEven: bool, vs1: Node, vs2: Node, vl: Node) -> tuple:
+    """Policy independent part of the vpair emulation.
+
+    Returns the (slid source, merge source, merge mask) operands of the final vmerge"""
+    vm_merge_mask = byte_pattern_mask(EVEN_LANES if pairEven else ODD_LANES, vs2.node_format.elt_type, vs2.node_format.lmul_type)
     merge_source = vs2 if pairEven else vs1
     slide_source = vs1 if pairEven else vs2
     if pairEven:
         slide_result = Operation(
             vs2.node_format,
-            OperationDescriptor(OperationType.SLIDEUP),
+            _op(OperationType.SLIDEUP),
             slide_source, # vslideup intrinsics always expect a destination as first argument (don't care for this op)
             slide_source,
-            Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.SIZE_T, None), 1),
+            _imm(SCALAR_SIZE_T_FMT, 1),
             vl,
             dst=None,
             tail_policy=TailPolicy.UNDEFINED,
@@ -328,44 +468,173 @@ def vpair_emulation(pairEven: bool, vs1: Node, vs2: Node, vl: Node, vm: Node, vd
     else:
         slide_result = Operation(
             vs2.node_format,
-            OperationDescriptor(OperationType.SLIDEDOWN),
+            _op(OperationType.SLIDEDOWN),
             slide_source,
-            Immediate(NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.SIZE_T, None), 1),
+            _imm(SCALAR_SIZE_T_FMT, 1),
             vl,
             dst=None,
             tail_policy=TailPolicy.UNDEFINED,
             mask_policy=MaskPolicy.UNMASKED,
         )
+    return slide_result, merge_source, vm_merge_mask
 
+
+def vpair_emulation(pairEven: bool, vs1: Node, vs2: Node, vl: Node, vm: Node, vd: Node, tail_policy: TailPolicy, mask_policy: MaskPolicy) -> Operation:
+    """vpair.even (vpair.odd) emulation: vs1 slid up (vs2 slid down) by one
+    element, merged with vs2 (vs1) on the even (odd) lanes.
+
+    Two operations for every SEW: going through the vzip widening interleave
+    would take a 2 * SEW view of both sources plus a mask, a shift and an or,
+    and has no SEW=ELEN form. The merge mask comes from the same shared 0x55 /
+    0xAA byte splats as the vunzip and vrgather vzip masks."""
+    slide_result, merge_source, vm_merge_mask = vpair_operands(pairEven, vs1, vs2, vl)
+    # vmerge already uses v0 for lane selection: unmasked variants carry their
+    # tail policy on it, masked ones apply vm (and policies) on the merged result
+    masked = mask_policy not in (MaskPolicy.UNDEFINED, MaskPolicy.UNMASKED)
     merge_result = Operation(
         vs2.node_format,
-        OperationDescriptor(OperationType.MERGE),
+        _op(OperationType.MERGE),
         slide_result,
         merge_source,
         vm_merge_mask,
         vl,
-        dst=vd,
-        tail_policy=tail_policy,
+        dst=None if masked else vd,
+        tail_policy=TailPolicy.AGNOSTIC if masked else tail_policy,
         mask_policy=MaskPolicy.UNMASKED,
     )
-    # FIXME: final masking with vpair[e/o] is required here to implement masking support
-    return merge_result    
+    if not masked:
+        return merge_result
+    return apply_policies(merge_result, vl, vm, vd, tail_policy, mask_policy)
+
+
+# dispatch tables of the select_*_emulation functions
+VZIP_ELEN_EMULATIONS = {False: vzip_emulation_elen_rgather, True: vzip_emulation_elen}       # key: elen_slides
+VZIP_NON_ELEN_EMULATIONS = {False: vzip_emulation_non_elen, True: vzip_emulation_zvbb}       # key: has_zvbb
+VUNZIP_EMULATIONS = {sew: vunzip_emulation_elen if sew == ELEN else vunzip_emulation_non_elen  # key: SEW
+                     for sew in (8, 16, 32, 64)}
 
 # ---------------------------------------------------------------------------
 # Valid parameter spaces
 # ---------------------------------------------------------------------------
 
-# TODO: adjust these to match the extension specification
-VALID_ELT_TYPES = [EltType.U8, EltType.U16, EltType.U32, EltType.U64] # Unsupported by emulation: EltType.U64
-VALID_LMULS = [LMULType.M1, LMULType.M2, LMULType.M4]    # Unsupported by emulation: LMULType.M8
+VALID_ELT_TYPES = [EltType.U8, EltType.U16, EltType.U32, EltType.U64]
+VALID_LMULS = [LMULType.MF8, LMULType.MF4, LMULType.MF2, LMULType.M1, LMULType.M2, LMULType.M4, LMULType.M8]
+ALL_TAIL_POLICIES = (TailPolicy.UNDISTURBED, TailPolicy.AGNOSTIC)
+ALL_MASK_POLICIES = (MaskPolicy.UNDISTURBED, MaskPolicy.AGNOSTIC, MaskPolicy.UNMASKED)
 
 
 # ---------------------------------------------------------------------------
 # Top-level generator
 # ---------------------------------------------------------------------------
 
-def generate_zvzip_emulation(
-    attributes: list[str] = [],
+def apply_filter(values: list, value_filter) -> list:
+    """Return <values> restricted to the members of <value_filter> (in the
+    order of <values>), or all of them when <value_filter> is None"""
+    if value_filter is None:
+        return list(values)
+    allowed = frozenset(value_filter)
+    return [value for value in values if value in allowed]
+
+
+@lru_cache(maxsize=None)
+def policy_matrix(tail_policies: tuple, mask_policies: tuple) -> tuple:
+    """Every (tail policy, mask policy, undisturbed, masked) combination:
+    undisturbed variants take a vd operand, masked ones a vm operand"""
+    return tuple(
+        (tail_policy, mask_policy,
+         tail_policy == TailPolicy.UNDISTURBED or mask_policy == MaskPolicy.UNDISTURBED,
+         mask_policy not in (MaskPolicy.UNDEFINED, MaskPolicy.UNMASKED))
+        for tail_policy, mask_policy in product(tail_policies, mask_policies)
+    )
+
+
+def is_valid_zvzip_block(elt_type: EltType, lmul: LMULType) -> bool:
+    """The (elt_type, lmul) instructions exist when both their base vector type
+    and the double LMUL vector type (vzip result, vunzip source) exist: LMUL=8
+    cannot be doubled, and a fractional LMUL must be valid for the element
+    width (its double and the widened 2 * SEW intermediates then are too)."""
+    return lmul != LMULType.M8 and LMULType.is_valid_for_eew(elt_type, lmul)
+
+
+def generate_zvzip_block(out: TextIO, elt_type: EltType, lmul: LMULType, tail_policies: list, mask_policies: list,
+                         attributes: list[str], prototypes: bool, definitions: bool, label_filter: str = None,
+                         elen_slides: bool = False, has_zvbb: bool = False) -> None:
+    """Write every (tail policy, mask policy) variant of the (elt_type, lmul)
+    Zvzip instructions to out, each output line is preceded by a newline."""
+    # emulation builders only depend on the element type (and requested features)
+    build_vzip = select_vzip_emulation(elt_type, elen_slides=elen_slides, has_zvbb=has_zvbb)
+    build_vunzip = select_vunzip_emulation(elt_type)
+    vl = Input(VL_FMT, 2, name="vl")
+
+    vuint_t = _fmt(NodeFormatType.VECTOR, elt_type, lmul)
+    wide_vbool_t = _fmt(NodeFormatType.MASK, elt_type, LMULType.multiply(lmul, 2))
+    std_vbool_t = _fmt(NodeFormatType.MASK, elt_type, lmul)
+    vd_fmt = _fmt(NodeFormatType.VECTOR, elt_type, LMULType.multiply(lmul, 2))
+
+    vs2 = Input(vuint_t, 0, name="vs2")
+    vs1 = Input(vuint_t, 1, name="vs1")
+    wide_vm = Input(wide_vbool_t, -2, name="vm")
+    std_vm = Input(std_vbool_t, -2, name="vm")
+    vd = Input(vuint_t, -1, name="vd")
+    vd_wide = Input(vd_fmt, -1, name="vd")
+    # input of vunzip is the widened (interleaved) vector, output is base format
+    widened_input = Input(vd_fmt, 0)
+
+    # every (tail, mask) variant is emitted with its own body: variants differ by
+    # signature (vm and vd parameters) and by the policy of their final operation,
+    # so none of them can be aliased to another one. The policy independent
+    # operands are memoized (see the *_operands builders): past the first variant,
+    # a variant only builds its prototype and its final policy-carrying operation.
+    for tail_policy, mask_policy, undisturbed, masked in policy_matrix(tuple(tail_policies), tuple(mask_policies)):
+        dst, dst_wide = (vd, vd_wide) if undisturbed else (None, None)
+        std_mask, wide_mask = (std_vm, wide_vm) if masked else (None, None)
+
+        def variant(fmt: NodeFormatDescriptor, op_type: OperationType, operands: tuple, mask: Node, dest: Node,
+                    build_emulation: Callable, *build_args) -> tuple:
+            """(prototype, deferred emulation) of one variant: both are built from the same
+            operand and policy nodes, so the definition renders the prototype parameters"""
+            prototype = Operation(fmt, _op(op_type), *operands, vm=mask, dst=dest,
+                                  tail_policy=tail_policy, mask_policy=mask_policy)
+            return prototype, partial(build_emulation, *build_args, mask, dest, tail_policy, mask_policy)
+
+        # emulations are only built for the selected instructions, and not at
+        # all when only prototypes are emitted
+        zvzip_insns = [
+            # vzip: interleave two base vectors into a widened result
+            variant(vd_fmt, OperationType.ZIP, (vs2, vs1, vl), wide_mask, dst_wide, build_vzip, vs1, vs2, vl),
+            # vunzip.even / vunzip.odd: deinterleave a widened vector
+            variant(vuint_t, OperationType.UNZIP_EVEN, (widened_input, vl), std_mask, dst,
+                    build_vunzip, True, widened_input, vl),
+            variant(vuint_t, OperationType.UNZIP_ODD, (widened_input, vl), std_mask, dst,
+                    build_vunzip, False, widened_input, vl),
+            # vpair.even / vpair.odd: pair the even (odd) elements of both sources
+            variant(vuint_t, OperationType.PAIR_EVEN, (vs2, vs1, vl), std_mask, dst, vpair_emulation, True, vs1, vs2, vl),
+            variant(vuint_t, OperationType.PAIR_ODD, (vs2, vs1, vl), std_mask, dst, vpair_emulation, False, vs1, vs2, vl),
+        ]
+
+        if label_filter is not None:
+            zvzip_insns = [(p, e) for p, e in zvzip_insns if re.search(label_filter, generate_intrinsic_name(p))]
+        out.write(generate_intrinsic_sections(
+            [(generate_intrinsic_name(proto),
+              *generate_intrinsic_proto_and_def(proto, build_emul() if definitions else None, attributes))
+             for proto, build_emul in zvzip_insns],
+            prototypes, definitions))
+
+
+@lru_cache(maxsize=256)
+def _generate_zvzip_block_str(elt_lmul: tuple, **kwargs) -> str:
+    """generate_zvzip_block into a string (also the process pool worker).
+
+    The generated code only depends on the (hashable) arguments: it is
+    memoized, so repeated configurations reuse the emitted block."""
+    out = io.StringIO()
+    generate_zvzip_block(out, *elt_lmul, **kwargs)
+    return out.getvalue()
+
+
+def write_zvzip_emulation(
+    output: TextIO,
+    attributes: list[str] = None,
     prototypes: bool = False,
     definitions: bool = True,
     lmul_filter: list = None,
@@ -373,167 +642,87 @@ def generate_zvzip_emulation(
     tail_policy_filter: list = None,
     mask_policy_filter: list = None,
     label_filter: str = None,
-):
-    """Generate all Zvzip instruction emulations.
+    elen_slides: bool = False,
+    has_zvbb: bool = False,
+    jobs: int = None,
+) -> None:
+    """Write all Zvzip instruction emulations to <output>, block by block.
 
     Args:
-        attributes: list of attributes to add to the generated code
+        output: text stream the generated code is written to
+        attributes: list of attributes to add to the generated code, defaults to
+            DEFAULT_ATTRIBUTES (see resolve_attributes)
         prototypes: if True, generate prototypes only
         definitions: if True, generate definitions only
         lmul_filter: if set, only generate for these LMULType values
         elt_filter: if set, only generate for these EltType values
         tail_policy_filter: if set, only generate for these TailPolicy values
         mask_policy_filter: if set, only generate for these MaskPolicy values
+        elen_slides: if True, emulate SEW=ELEN vzip with masked slides instead of a vrgatherei16
+            (for cores where vrgather is much slower than vslide)
+        has_zvbb: if True, emulate SEW<ELEN vzip with Zvbb widening shifts (vwsll)
+        jobs: if greater than 1, generate the (elt, lmul) blocks in a pool of
+            <jobs> processes (output order is unchanged), 0 uses one process per CPU
     """
-    output = []
-
-    vl_type = NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T, None)
-    vl = Input(vl_type, 2, name="vl")
-
-    output.append("#include <stdint.h>\n")
-    output.append("#include <riscv_vector.h>\n")
-    output.append("#include <stddef.h>\n")
-
-    all_elt_types = VALID_ELT_TYPES
-    all_lmuls = VALID_LMULS
-    all_tail_policies = [TailPolicy.UNDISTURBED, TailPolicy.AGNOSTIC]
-    all_mask_policies = [MaskPolicy.UNDISTURBED, MaskPolicy.AGNOSTIC, MaskPolicy.UNMASKED]
-
-    elt_types = [e for e in all_elt_types if elt_filter is None or e in elt_filter]
-    lmuls = [l for l in all_lmuls if lmul_filter is None or l in lmul_filter]
-    tail_policies = [t for t in all_tail_policies if tail_policy_filter is None or t in tail_policy_filter]
-    mask_policies = [m for m in all_mask_policies if mask_policy_filter is None or m in mask_policy_filter]
-
-    for elt_type in elt_types:
-        for lmul in lmuls:
-            vuint_t = NodeFormatDescriptor(NodeFormatType.VECTOR, elt_type, lmul)
-            wide_vbool_t = NodeFormatDescriptor(NodeFormatType.MASK, elt_type, LMULType.multiply(lmul, 2))
-            std_vbool_t = NodeFormatDescriptor(NodeFormatType.MASK, elt_type, lmul)
-            vd_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, elt_type, LMULType.multiply(lmul, 2))
-
-            vs2 = Input(vuint_t, 0, name="vs2")
-            vs1 = Input(vuint_t, 1, name="vs1")
-            wide_vm = Input(wide_vbool_t, -2, name="vm")
-            std_vm = Input(std_vbool_t, -2, name="vm")
-            vd = Input(vuint_t, -1, name="vd")
-            vd_wide = Input(vd_fmt, -1, name="vd")
-
-            for tail_policy in tail_policies:
-                for mask_policy in mask_policies:
-                    dst = vd if tail_policy == TailPolicy.UNDISTURBED or mask_policy == MaskPolicy.UNDISTURBED else None
-                    dst_wide = vd_wide if tail_policy == TailPolicy.UNDISTURBED or mask_policy == MaskPolicy.UNDISTURBED else None
-                    wide_mask = wide_vm if mask_policy not in (MaskPolicy.UNDEFINED, MaskPolicy.UNMASKED) else None
-                    std_mask = std_vm if mask_policy not in (MaskPolicy.UNDEFINED, MaskPolicy.UNMASKED) else None
-
-                    # --- vzip: interleave two base vectors into a widened result ---
-                    # vzip only valid when widened elt_type and widened lmul exist
-
-                    vzip_vv_prototype = Operation(
-                        vd_fmt,
-                        OperationDescriptor(OperationType.ZIP),
-                        vs2,
-                        vs1,
-                        vl,
-                        vm=wide_mask,
-                        tail_policy=tail_policy,
-                        mask_policy=mask_policy,
-                        dst=dst_wide,
-                    )
-                    vzip_vv_emulation = vzip_emulation(vs2, vs1, vl, wide_mask, dst_wide, tail_policy, mask_policy)
-
-                    # --- vunzip.even / vunzip.odd: deinterleave widened vector ---
-                    # input is the widened (interleaved) vector, output is base format
-                    widened_input = Input(vd_fmt, 0)
-
-                    vunzip_even_prototype = Operation(
-                        vuint_t,
-                        OperationDescriptor(OperationType.UNZIP_EVEN),
-                        widened_input,
-                        vl,
-                        vm=std_mask,
-                        tail_policy=tail_policy,
-                        mask_policy=mask_policy,
-                        dst=dst,
-                    )
-                    vunzip_even_emulation = vunzip_emulation(True, widened_input, vl, std_mask, dst, tail_policy, mask_policy)
-
-                    vunzip_odd_prototype = Operation(
-                        vuint_t,
-                        OperationDescriptor(OperationType.UNZIP_ODD),
-                        widened_input,
-                        vl,
-                        vm=std_mask,
-                        tail_policy=tail_policy,
-                        mask_policy=mask_policy,
-                        dst=dst,
-                    )
-                    vunzip_odd_emulation = vunzip_emulation(False, widened_input, vl, std_mask, dst, tail_policy, mask_policy)
-
-                    vpair_even_prototype = Operation(
-                        vuint_t,
-                        OperationDescriptor(OperationType.PAIR_EVEN),
-                        vs2,
-                        vs1,
-                        vl,
-                        vm=std_mask,
-                        tail_policy=tail_policy,
-                        mask_policy=mask_policy,
-                        dst=dst,
-                    )
-                    vpair_even_emulation = vpair_emulation(True, vs1, vs2, vl, std_mask, dst, tail_policy, mask_policy)
-
-                    vpair_odd_prototype = Operation(
-                        vuint_t,
-                        OperationDescriptor(OperationType.PAIR_ODD),
-                        vs2,
-                        vs1,
-                        vl,
-                        vm=std_mask,
-                        tail_policy=tail_policy,
-                        mask_policy=mask_policy,
-                        dst=dst,
-                    )
-                    vpair_odd_emulation = vpair_emulation(False, vs1, vs2, vl, std_mask, dst, tail_policy, mask_policy)
-
-                    zvzip_insns = [
-                        (vzip_vv_prototype, vzip_vv_emulation),
-                        (vunzip_even_prototype, vunzip_even_emulation),
-                        (vunzip_odd_prototype, vunzip_odd_emulation),
-                        (vpair_even_prototype, vpair_even_emulation),
-                        (vpair_odd_prototype, vpair_odd_emulation),
-                    ]
-
-                    if label_filter is not None:
-                        zvzip_insns = [(p, e) for p, e in zvzip_insns if re.search(label_filter, generate_intrinsic_name(p))]
-                    if prototypes:
-                        output.append("// prototypes")
-                        for proto, _ in zvzip_insns:
-                            output.append(generate_intrinsic_prototype(proto))
-                    if definitions:
-                        output.append("\n// intrinsics")
-                        for proto, emul in zvzip_insns:
-                            output.append(generate_intrinsic_from_operation(proto, emul, attributes=attributes))
-
-
-
-    return "\n".join(output)
+    attributes = resolve_attributes(attributes, prototypes)
+
+    output.write("#include <stdint.h>\n")
+    output.write("\n#include <riscv_vector.h>\n")
+    output.write("\n#include <stddef.h>\n")
+
+    elt_types = apply_filter(VALID_ELT_TYPES, elt_filter)
+    lmuls = apply_filter(VALID_LMULS, lmul_filter)
+    tail_policies = apply_filter(ALL_TAIL_POLICIES, tail_policy_filter)
+    mask_policies = apply_filter(ALL_MASK_POLICIES, mask_policy_filter)
+
+    block_kwargs = dict(tail_policies=tuple(tail_policies), mask_policies=tuple(mask_policies),
+                        attributes=tuple(attributes), prototypes=prototypes, definitions=definitions,
+                        label_filter=label_filter, elen_slides=elen_slides, has_zvbb=has_zvbb)
+    blocks = [block for block in product(elt_types, lmuls) if is_valid_zvzip_block(*block)]
+    # (elt, lmul) blocks are independent: only enums and strings cross the process boundary
+    for block in generate_blocks(_generate_zvzip_block_str, blocks, jobs, **block_kwargs):
+        output.write(block)
+
+
+def generate_zvzip_emulation(
+    attributes: list[str] = None,
+    prototypes: bool = False,
+    definitions: bool = True,
+    lmul_filter: list = None,
+    elt_filter: list = None,
+    tail_policy_filter: list = None,
+    mask_policy_filter: list = None,
+    label_filter: str = None,
+    elen_slides: bool = False,
+    has_zvbb: bool = False,
+    jobs: int = None,
+):
+    """Generate all Zvzip instruction emulations, see write_zvzip_emulation
+    for the arguments, and return them as a string."""
+    output = io.StringIO()
+    write_zvzip_emulation(output, attributes=attributes, prototypes=prototypes, definitions=definitions,
+                          lmul_filter=lmul_filter, elt_filter=elt_filter, tail_policy_filter=tail_policy_filter,
+                          mask_policy_filter=mask_policy_filter, label_filter=label_filter,
+                          elen_slides=elen_slides, has_zvbb=has_zvbb, jobs=jobs)
+    return output.getvalue()
 
 
 # ---------------------------------------------------------------------------
 # CLI entry point
 # ---------------------------------------------------------------------------
 
-def main(attributes: list[str] = [], prototypes: bool = False, definitions: bool = True):
+def main(attributes: list[str] = None, prototypes: bool = False, definitions: bool = True):
     """CLI entry point for generating Zvzip emulation code."""
-    print(generate_zvzip_emulation(attributes=attributes, prototypes=prototypes, definitions=definitions))
+    write_zvzip_emulation(sys.stdout, attributes=attributes, prototypes=prototypes, definitions=definitions)
+    sys.stdout.write("\n")
 
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument("-a", "--attributes", nargs="+", default=[], help="Attributes to add to the generated code")
+    parser.add_argument("-a", "--attributes", nargs="+", default=None, help="Attributes to add to the generated code (default: static inline always_inline)")
     parser.add_argument("-p", "--prototypes", default=False, action="store_true", help="generate prototypes")
-    parser.add_argument("--no-definitions", default=True, action="store_false", help="do not generate definitions")
+    parser.add_argument("--no-definitions", default=False, action="store_true", help="do not generate definitions")
     args = parser.parse_args()
 
     main(attributes=args.attributes, prototypes=args.prototypes, definitions=not args.no_definitions)
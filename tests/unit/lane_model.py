@@ -0,0 +1,128 @@
+"""Lane-level evaluation of the emulation IR (VLEN = 128), shared by the unit tests
+
+Vectors evaluate to lane lists (None for agnostic lanes), masks to VLEN bit
+lists and scalars to ints. Inputs are looked up by name in the environment,
+and every lane is wrapped to the element type of its node format."""
+
+from rie_generator.core import (
+    EltType,
+    LMULType,
+    NodeFormatType,
+    NodeType,
+    OperationType,
+    TailPolicy,
+    MaskPolicy,
+    element_size,
+)
+
+
+VLEN = 128
+
+
+def vlmax(node_format):
+    return int(VLEN * LMULType.to_value(node_format.lmul_type)) // element_size(node_format.elt_type)
+
+
+def wrap(value, size, signed):
+    """<value> truncated to <size> bits, two's complement if signed"""
+    value &= (1 << size) - 1
+    return value - (1 << size) if signed and value >> (size - 1) else value
+
+
+def wrap_elt(value, elt_type):
+    return wrap(value, element_size(elt_type), EltType.is_signed(elt_type))
+
+
+# element-wise operations (the result is wrapped to the node element type)
+LANE_OPS = {
+    OperationType.ADD: lambda a, b: a + b,
+    OperationType.AND: lambda a, b: a & b,
+    OperationType.OR: lambda a, b: a | b,
+    OperationType.SLL: lambda a, b: a << b,
+    # the operands are already signed or unsigned, as their formats
+    OperationType.SRL: lambda a, b: a >> b,
+    OperationType.SRA: lambda a, b: a >> b,
+    OperationType.NSRL: lambda a, b: a >> b,
+    OperationType.NSRA: lambda a, b: a >> b,
+}
+
+# signedness of the two multiplicands of the widening multiply-accumulates
+MAC_SIGNEDNESS = {
+    OperationType.WMACC: (True, True),
+    OperationType.WMACCU: (False, False),
+    OperationType.WMACCSU: (True, False),
+    OperationType.WMACCUS: (False, True),
+}
+
+
+def _at(value, i):
+    return value[i] if isinstance(value, list) else value
+
+
+def evaluate(node, env):
+    """Value of <node> in <env>"""
+    if node.node_type == NodeType.INPUT:
+        return env[node.name]
+    if node.node_type == NodeType.IMMEDIATE:
+        return node.value
+    op_type = node.op_desc.op_type
+    args = [evaluate(arg, env) for arg in node.args]
+    node_format = node.node_format
+    if op_type == OperationType.VSETVLMAX:
+        return vlmax(node.args[0].node_format)
+    if node_format.node_format_type == NodeFormatType.VECTOR_LENGTH:
+        assert op_type == OperationType.MUL
+        return args[0] * args[1]
+    if node_format.node_format_type == NodeFormatType.SCALAR:
+        value = args[0] if op_type == OperationType.REINTERPRET else LANE_OPS[op_type](*args)
+        return wrap_elt(value, node_format.elt_type)
+    if op_type == OperationType.REINTERPRET:
+        src_size = element_size(node.args[0].node_format.elt_type)
+        data = b"".join(wrap(lane, src_size, False).to_bytes(src_size // 8, "little") for lane in args[0])
+        if node_format.node_format_type == NodeFormatType.MASK:
+            return [bool(data[i // 8] >> (i % 8) & 1) for i in range(VLEN)]
+        size = element_size(node_format.elt_type) // 8
+        return [wrap_elt(int.from_bytes(data[i:i + size], "little"), node_format.elt_type)
+                for i in range(0, len(data), size)]
+    if op_type == OperationType.CREATE:
+        return sum(args, [])
+    if op_type == OperationType.GET:
+        count = vlmax(node_format)
+        return args[0][args[1] * count:(args[1] + 1) * count]
+    vl = args[-1]
+    if op_type == OperationType.MV:
+        lane = lambda i: _at(args[0], i)
+    elif op_type == OperationType.ZEXT_VF2:
+        lane = lambda i: args[0][i]
+    elif op_type in LANE_OPS:
+        lane = lambda i: None if args[0][i] is None else LANE_OPS[op_type](args[0][i], _at(args[1], i))
+    elif op_type in MAC_SIGNEDNESS:
+        signedness = MAC_SIGNEDNESS[op_type]
+        sizes = [element_size(arg.node_format.elt_type) for arg in node.args[1:3]]
+
+        def lane(i):
+            lhs, rhs = (wrap(_at(value, i), size, signed) for value, size, signed in zip(args[1:3], sizes, signedness))
+            return args[0][i] + lhs * rhs
+    elif op_type == OperationType.MERGE:
+        lane = lambda i: args[1][i] if args[2][i] else args[0][i]
+    elif op_type == OperationType.SLIDEDOWN:
+        src, offset = args[0], args[1]
+        lane = lambda i: src[i + offset] if i + offset < len(src) else 0
+    elif op_type == OperationType.SLIDEUP:
+        # vslideup leaves the lanes below the offset of its destination unchanged
+        dest, src, offset = (args[0], args[1], args[2]) if len(args) == 4 else (evaluate(node.dst, env), args[0], args[1])
+        lane = lambda i: src[i - offset] if i >= offset else dest[i]
+    else:
+        raise NotImplementedError(op_type)
+    mask = None if node.vm is None else evaluate(node.vm, env)
+    dst = None if node.dst is None else evaluate(node.dst, env)
+    result = []
+    for i in range(vlmax(node_format)):
+        if i >= vl:
+            result.append(dst[i] if node.tail_policy == TailPolicy.UNDISTURBED else None)
+        elif mask is not None and not mask[i]:
+            result.append(dst[i] if node.mask_policy == MaskPolicy.UNDISTURBED else None)
+        else:
+            value = lane(i)
+            result.append(None if value is None else wrap_elt(value, node_format.elt_type))
+    return result
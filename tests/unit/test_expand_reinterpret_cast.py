@@ -0,0 +1,48 @@
+"""Unit tests for expand_reinterpret_cast"""
+
+from rie_generator.core import (
+    EltType,
+    LMULType,
+    NodeFormatDescriptor,
+    NodeFormatType,
+    NodeType,
+    Input,
+    OperationType,
+    expand_reinterpret_cast,
+)
+
+
+def vector_fmt(elt_type):
+    return NodeFormatDescriptor(NodeFormatType.VECTOR, elt_type, LMULType.M2)
+
+
+def test_sign_and_width_change_is_split():
+    src = Input(vector_fmt(EltType.U32), 0, name="vs2")
+    result = expand_reinterpret_cast(src, vector_fmt(EltType.S64))
+    assert result.op_desc.op_type == OperationType.REINTERPRET
+    assert result.node_format.elt_type == EltType.S64
+    assert result.args[0].node_format.elt_type == EltType.S32
+    assert result.args[0].args[0] is src
+
+
+def test_round_trip_is_folded():
+    src = Input(vector_fmt(EltType.U32), 0, name="vs2")
+    signed = expand_reinterpret_cast(src, vector_fmt(EltType.S32))
+    assert expand_reinterpret_cast(signed, vector_fmt(EltType.U32)) is src
+
+
+def test_chain_restarts_from_original_source():
+    src = Input(vector_fmt(EltType.U32), 0, name="vs2")
+    as_u64 = expand_reinterpret_cast(src, vector_fmt(EltType.U64))
+    result = expand_reinterpret_cast(as_u64, vector_fmt(EltType.U8))
+    assert result.node_format.elt_type == EltType.U8
+    assert result.args[0] is src
+    assert src.node_type == NodeType.INPUT
+
+
+def test_equal_formats_need_no_cast():
+    # descriptors compare by value: a freshly built equal format is a no-op cast
+    src = Input(vector_fmt(EltType.U32), 0, name="vs2")
+    assert vector_fmt(EltType.U32) == src.node_format
+    assert hash(vector_fmt(EltType.U32)) == hash(src.node_format)
+    assert expand_reinterpret_cast(src, vector_fmt(EltType.U32)) is src
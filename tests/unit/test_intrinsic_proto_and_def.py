@@ -0,0 +1,107 @@
+"""Unit tests for the intrinsic rendering helpers of core"""
+
+import pytest
+from rie_generator.core import (
+    EltType,
+    LMULType,
+    NodeFormatDescriptor,
+    NodeFormatType,
+    CodeObject,
+    Immediate,
+    Input,
+    Operation,
+    OperationDescriptor,
+    OperationType,
+    TailPolicy,
+    MaskPolicy,
+    generate_intrinsic_prototype,
+    generate_intrinsic_from_operation,
+    generate_intrinsic_proto_and_def,
+    generate_intrinsic_sections,
+    _generate_intrinsic_name,
+    DEFAULT_ATTRIBUTES,
+    resolve_attributes,
+    generate_operation,
+    generate_blocks,
+    element_size,
+)
+
+
+def build_vadd_insn(tail_policy, mask_policy):
+    vec_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U32, LMULType.M1)
+    vl = Input(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T), 2, name="vl")
+    vs2 = Input(vec_fmt, 0, name="vs2")
+    vs1 = Input(vec_fmt, 1, name="vs1")
+    vd = Input(vec_fmt, -1, name="vd")
+    vm = Input(NodeFormatDescriptor(NodeFormatType.MASK, EltType.U32, LMULType.M1), -2, name="vm")
+    dst = vd if tail_policy == TailPolicy.UNDISTURBED or mask_policy == MaskPolicy.UNDISTURBED else None
+    kwargs = dict(vm=vm, dst=dst, tail_policy=tail_policy, mask_policy=mask_policy)
+    proto = Operation(vec_fmt, OperationDescriptor(OperationType.ADD), vs2, vs1, vl, **kwargs)
+    emul = Operation(vec_fmt, OperationDescriptor(OperationType.ADD), vs2, vs1, vl, **kwargs)
+    return proto, emul
+
+
+@pytest.mark.parametrize("tail_policy", [TailPolicy.UNDISTURBED, TailPolicy.AGNOSTIC])
+@pytest.mark.parametrize("mask_policy", [MaskPolicy.UNDISTURBED, MaskPolicy.AGNOSTIC, MaskPolicy.UNMASKED])
+def test_matches_separate_generation(tail_policy, mask_policy):
+    proto, emul = build_vadd_insn(tail_policy, mask_policy)
+    proto_str, def_str = generate_intrinsic_proto_and_def(proto, emul, ["static"])
+    assert proto_str == generate_intrinsic_prototype(proto)
+    assert def_str == generate_intrinsic_from_operation(proto, emul, ["static"])
+
+
+def test_masked_undisturbed_signature():
+    proto, emul = build_vadd_insn(TailPolicy.UNDISTURBED, MaskPolicy.UNDISTURBED)
+    proto_str, def_str = generate_intrinsic_proto_and_def(proto, emul, [])
+    assert proto_str == "vuint32m1_t __riscv_vadd_vv_u32m1_tumu(vbool32_t, vuint32m1_t, vuint32m1_t, vuint32m1_t, size_t);"
+    assert def_str.startswith(" vuint32m1_t __riscv_vadd_vv_u32m1_tumu(vbool32_t vm, vuint32m1_t vd, vuint32m1_t vs2, vuint32m1_t vs1, size_t vl) {")
+
+
+def test_structurally_equal_prototypes_share_name():
+    first, _ = build_vadd_insn(TailPolicy.AGNOSTIC, MaskPolicy.AGNOSTIC)
+    generate_intrinsic_prototype(first)
+    hits = _generate_intrinsic_name.cache_info().hits
+    # distinct nodes (and descriptors) with the same structure
+    second, _ = build_vadd_insn(TailPolicy.AGNOSTIC, MaskPolicy.AGNOSTIC)
+    assert generate_intrinsic_prototype(second) == generate_intrinsic_prototype(first)
+    assert _generate_intrinsic_name.cache_info().hits == hits + 2
+
+
+def test_sections_layout():
+    insns = [build_vadd_insn(TailPolicy.AGNOSTIC, MaskPolicy.UNMASKED),
+             build_vadd_insn(TailPolicy.UNDISTURBED, MaskPolicy.AGNOSTIC)]
+    rendered = [(None, *generate_intrinsic_proto_and_def(proto, emul, ["static"])) for proto, emul in insns]
+    expected = "\n// prototypes" + "".join("\n" + p for _, p, _ in rendered) + \
+        "\n\n// intrinsics" + "".join("\n" + d for _, _, d in rendered)
+    assert generate_intrinsic_sections(rendered, True, True) == expected
+    # emulations are not needed when only prototypes are generated
+    prototypes_only = [(None, *generate_intrinsic_proto_and_def(proto, None, [])) for proto, _ in insns]
+    assert prototypes_only[0][2] is None
+    assert generate_intrinsic_sections(prototypes_only, True, False) == expected[:expected.index("\n\n// intrinsics")]
+
+
+@pytest.mark.parametrize("lmul, expected", [
+    (LMULType.M2, "__riscv_vsetvlmax_e32m2()"),
+    (LMULType.MF2, "__riscv_vsetvlmax_e32mf2()"),
+])
+def test_vsetvlmax_lmul_token(lmul, expected):
+    placeholder = Immediate(NodeFormatDescriptor(NodeFormatType.PLACEHOLDER, EltType.U32, lmul), None)
+    vl_fmt = NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T)
+    vlmax = Operation(vl_fmt, OperationDescriptor(OperationType.VSETVLMAX), placeholder)
+    assert generate_operation(CodeObject(""), vlmax, {}) == expected
+
+
+def test_resolve_attributes():
+    assert resolve_attributes(None, False) == DEFAULT_ATTRIBUTES
+    # explicit attributes, even empty, are kept
+    assert resolve_attributes([], False) == []
+    assert resolve_attributes(["static"], True) == ["static"]
+    # no static definition after the (non-static) prototypes
+    assert resolve_attributes(None, True) == []
+
+
+@pytest.mark.parametrize("jobs", [None, 0, 1, 3])
+def test_generate_blocks_keeps_order(jobs):
+    elt_types = [EltType.U64, EltType.U8, EltType.S32, EltType.U16]
+    # element_size stands for a module-level block generator
+    assert generate_blocks(element_size, elt_types, jobs) == [64, 8, 32, 16]
@@ -0,0 +1,154 @@
+"""Unit tests for the Zvdot4a8i widening multiply-accumulate emulation"""
+
+import pytest
+from rie_generator.core import (
+    EltType,
+    LMULType,
+    NodeFormatDescriptor,
+    NodeFormatType,
+    Input,
+    TailPolicy,
+    MaskPolicy,
+    OperationType,
+    generate_intrinsic_name,
+)
+from rie_generator.zvdot4a8i_emulation import (
+    dot4_pipeline,
+    dot4_su,
+    dot_k_mac,
+    generate_zvdot4a8i_emulation,
+    get_lane_lmul,
+)
+
+from lane_model import wrap, evaluate
+
+
+def test_mac_chain_keeps_policies():
+    vint32_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.S32, LMULType.M8)
+    vuint32_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U32, LMULType.M8)
+    vl = Input(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T), 3, name="vl")
+    vm = Input(NodeFormatDescriptor(NodeFormatType.MASK, EltType.U32, LMULType.M8), -2, name="vm")
+    vd = Input(vint32_t, 2, name="vd")
+    result = dot4_su(Input(vint32_t, 0, name="vs2"), Input(vuint32_t, 1, name="vs1"), vd, vl,
+                     TailPolicy.UNDISTURBED, MaskPolicy.UNDISTURBED, vm)
+    assert generate_intrinsic_name(result) == "__riscv_vwmaccsu_vv_i32m8_tumu"
+    # each accumulation step chains on the previous one, down to vd
+    acc = result
+    for _ in range(4):
+        assert acc.dst is acc.args[0]
+        assert acc.vm is vm
+        acc = acc.args[0]
+    assert acc is vd
+
+
+def test_mac_accumulator_not_duplicated():
+    code = generate_zvdot4a8i_emulation(lmul_filter=[LMULType.M1], tail_policy_filter=[TailPolicy.UNDISTURBED],
+                                        mask_policy_filter=[MaskPolicy.UNMASKED], label_filter="vdot4au_vv")
+    assert "__riscv_vwmaccu_vv_u32m1_tu(vd, " in code
+
+
+def test_lane_extractions_precede_mac_chain():
+    code = generate_zvdot4a8i_emulation(lmul_filter=[LMULType.M2], tail_policy_filter=[TailPolicy.AGNOSTIC],
+                                        mask_policy_filter=[MaskPolicy.AGNOSTIC], label_filter="vdot4a_vv")
+    body = [line for line in code.splitlines() if "__riscv_vw" in line or "__riscv_vn" in line]
+    mac_lines = [index for index, line in enumerate(body) if "vwmacc" in line]
+    assert mac_lines == list(range(len(body) - 4, len(body)))
+
+
+def test_vx_uses_scalar_mac():
+    code = generate_zvdot4a8i_emulation(lmul_filter=[LMULType.M1], tail_policy_filter=[TailPolicy.AGNOSTIC],
+                                        mask_policy_filter=[MaskPolicy.UNMASKED], label_filter="_vx_")
+    assert code.count("__riscv_vwmaccsu_vx_i32m1(") == 4
+    assert code.count("__riscv_vwmaccus_vx_i32m1(") == 4
+    assert "__riscv_vmv_v_x" not in code
+    # vdota4us.vx: signed rs1 bytes go straight to vwmaccsu.vx
+    vdota4us = code[code.index("__riscv_vdot4aus_vx_i32m1("):]
+    assert vdota4us.count("(int8_t)") == 4
+
+
+def test_legacy_dot4_pipeline_swapped_operands():
+    vint32_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.S32, LMULType.M1)
+    vuint32_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U32, LMULType.M1)
+    vl = Input(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T), 3, name="vl")
+    rs1 = Input(NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.U32), 1, name="rs1")
+    vd = Input(vint32_t, 2, name="vd")
+    # former vdota4us calling convention: signed rs1 first, unsigned vs2 second
+    result = dot4_pipeline(rs1, Input(vuint32_t, 0, name="vs2"), vd, OperationType.WMULSU, OperationType.WADD, vl)
+    assert generate_intrinsic_name(result) == "__riscv_vwmaccsu_vx_i32m1"
+
+
+@pytest.mark.parametrize("lmul, lane_lmul", [
+    (LMULType.MF4, None),
+    (LMULType.MF2, LMULType.MF4),
+    (LMULType.M8, LMULType.M4),
+])
+def test_lane_lmul(lmul, lane_lmul):
+    assert get_lane_lmul(lmul) == lane_lmul
+
+
+def test_unroll_independent_accumulators():
+    code = generate_zvdot4a8i_emulation(lmul_filter=[LMULType.M1], tail_policy_filter=[TailPolicy.UNDISTURBED],
+                                        mask_policy_filter=[MaskPolicy.UNDISTURBED], label_filter="vdot4au_vv",
+                                        unroll_independent=True)
+    assert code.count("__riscv_vwmaccu_vv_u32m1(") == 4
+    assert code.count("__riscv_vadd_vv_u32m1(") == 2
+    assert code.count("__riscv_vadd_vv_u32m1_tumu(vm, vd, ") == 1
+
+
+@pytest.mark.parametrize("lmul, grouped", [(LMULType.M1, False), (LMULType.M2, True), (LMULType.M8, False)])
+def test_group_lanes(lmul, grouped):
+    code = generate_zvdot4a8i_emulation(lmul_filter=[lmul], tail_policy_filter=[TailPolicy.AGNOSTIC],
+                                        mask_policy_filter=[MaskPolicy.UNMASKED], label_filter="vdot4a_vv",
+                                        group_lanes=True)
+    assert code.count("__riscv_vcreate_v_") == (2 if grouped else 0)
+
+
+def test_variant_emission_is_memoized():
+    kwargs = dict(lmul_filter=[LMULType.M4], tail_policy_filter=[TailPolicy.AGNOSTIC],
+                  mask_policy_filter=[MaskPolicy.AGNOSTIC], attributes=["static"])
+    first = generate_zvdot4a8i_emulation(**kwargs)
+    assert generate_zvdot4a8i_emulation(**kwargs) == first
+
+
+@pytest.mark.parametrize("lane_width, lane_count", [(4, 8), (8, 4), (16, 2)])
+def test_dot_k_lane_count(lane_width, lane_count):
+    vint32_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.S32, LMULType.M1)
+    vl = Input(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T), 3, name="vl")
+    vd = Input(vint32_t, 2, name="vd")
+    acc = dot_k_mac(Input(vint32_t, 0, name="vs2"), Input(vint32_t, 1, name="vs1"), vd, True, True, vl,
+                    lane_width=lane_width)
+    macs = 0
+    while acc is not vd:
+        assert acc.op_desc.op_type == OperationType.WMACC
+        acc = acc.args[0]
+        macs += 1
+    assert macs == lane_count
+
+
+@pytest.mark.parametrize("independent_accumulators", [False, True])
+@pytest.mark.parametrize("is_vx", [False, True])
+@pytest.mark.parametrize("vs2_signed, vs1_signed", [(False, False), (True, True), (True, False), (False, True)])
+@pytest.mark.parametrize("lane_width", [4, 8, 16])
+def test_dot_k_mac_lanes(lane_width, vs2_signed, vs1_signed, is_vx, independent_accumulators):
+    signed_result = vs2_signed or vs1_signed
+    vuint32_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U32, LMULType.M1)
+    vd_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.S32 if signed_result else EltType.U32, LMULType.M1)
+    vs1_t = NodeFormatDescriptor(NodeFormatType.SCALAR, EltType.U32) if is_vx else vuint32_t
+    vl = Input(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T), 3, name="vl")
+    acc = dot_k_mac(Input(vuint32_t, 0, name="vs2"), Input(vs1_t, 1, name="vs1"), Input(vd_t, 2, name="vd"),
+                    vs2_signed, vs1_signed, vl, lane_width=lane_width,
+                    independent_accumulators=independent_accumulators)
+    vs2 = [0x0123abcd, 0xfedc5432, 0x80017fff, 0xffffffff]
+    vs1 = [0x9876f00f, 0x7f80ff01, 0xffff8000, 0x01010101]
+    vd = [wrap(value, 32, signed_result) for value in [5, -7, 0x7ffffff0, -0x80000000]]
+    env = {"vl": 3, "vs2": vs2, "vs1": vs1[0] if is_vx else vs1, "vd": vd}
+
+    def fields(value, signed):
+        return [wrap(value >> (lane_width * k), lane_width, signed) for k in range(32 // lane_width)]
+
+    expected = [
+        wrap(vd[i] + sum(a * b for a, b in zip(fields(vs2[i], vs2_signed), fields(_vs1, vs1_signed))), 32, signed_result)
+        for i, _vs1 in enumerate([vs1[0]] * 4 if is_vx else vs1)
+    ]
+    # tail agnostic: only the vl first elements are checked
+    assert evaluate(acc, env)[:3] == expected[:3]
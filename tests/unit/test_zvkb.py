@@ -0,0 +1,116 @@
+"""Unit tests for the Zvkb emulation"""
+
+import io
+
+import pytest
+from rie_generator.core import (
+    EltType,
+    LMULType,
+    NodeFormatDescriptor,
+    NodeFormatType,
+    Input,
+    OperationType,
+    TailPolicy,
+    MaskPolicy,
+)
+from rie_generator.zvkb_emulation import (
+    NIBBLE_REVERSE_LUT_LO,
+    OP_TABLE,
+    _shared_op,
+    brev8,
+    generate_zvkb_block,
+    generate_zvkb_emulation,
+    lmul_tokens,
+    render_zvkb_insns,
+    to_lmul_template,
+    zvkb_operands,
+)
+
+
+def test_brev8_masks_shared_across_lmuls():
+    vl = Input(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T), 2, name="vl")
+    masks = []
+    for lmul in [LMULType.M1, LMULType.M8]:
+        op0 = Input(NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U16, lmul), 0)
+        # last swap step: (x & 0x5555) << 1 | ((x >> 1) & 0x5555)
+        masks.append(brev8(op0, vl).args[1].args[1])
+    assert masks[0] is masks[1]
+    assert masks[0].value == 0x5555
+
+
+def test_swap_steps_shared_across_policies():
+    policies = [(TailPolicy.UNDISTURBED, MaskPolicy.UNMASKED), (TailPolicy.AGNOSTIC, MaskPolicy.UNMASKED)]
+    op_table = [entry for entry in OP_TABLE if entry[0] == OperationType.REV8]
+    before = _shared_op.cache_info()
+    generate_zvkb_block(io.StringIO(), EltType.U32, [LMULType.M1], *zip(*policies), op_table=op_table,
+                        attributes=[], prototypes=False, definitions=True)
+    after = _shared_op.cache_info()
+    # the second policy variant reuses every inner step of the first one
+    assert after.misses > before.misses
+    assert after.hits - before.hits == after.misses - before.misses
+
+
+def test_rev8_u8_keeps_policies():
+    code = generate_zvkb_emulation([], False, True, lmul_filter=[LMULType.M1], elt_filter=[EltType.U8],
+                                   tail_policy_filter=[TailPolicy.UNDISTURBED], label_filter="vrev8")
+    assert "__riscv_vor_vv_u8m1_tumu(vm, vd, op0, op0, vl)" in code
+    assert "__riscv_vor_vv_u8m1_tu(vd, op0, op0, vl)" in code
+
+
+def test_ops_selection():
+    code = generate_zvkb_emulation([], True, False, lmul_filter=[LMULType.M1], elt_filter=[EltType.U32],
+                                   tail_policy_filter=[TailPolicy.AGNOSTIC], mask_policy_filter=[MaskPolicy.UNMASKED],
+                                   ops={OperationType.ROR, OperationType.ROL})
+    protos = [line for line in code.splitlines() if line.startswith("vuint32m1_t")]
+    assert [proto.split("(")[0].split()[1] for proto in protos] == [
+        "__riscv_vror_vv_u32m1", "__riscv_vror_vx_u32m1", "__riscv_vrol_vv_u32m1", "__riscv_vrol_vx_u32m1",
+    ]
+
+
+@pytest.mark.parametrize("elt_type", [EltType.U8, EltType.U64])
+def test_lmul_template_matches_direct_rendering(elt_type):
+    args = (TailPolicy.UNDISTURBED, MaskPolicy.UNDISTURBED, OP_TABLE, ["static"], True)
+    m1_tokens = lmul_tokens(LMULType.M1)
+    m8_tokens = lmul_tokens(LMULType.M8)
+    direct = render_zvkb_insns(zvkb_operands(elt_type, LMULType.M8), *args)
+    templated = [tuple(to_lmul_template(code, m1_tokens).format_map(m8_tokens) for code in insn)
+                 for insn in render_zvkb_insns(zvkb_operands(elt_type, LMULType.M1), *args)]
+    assert templated == direct
+
+
+def test_native_guard():
+    kwargs = dict(lmul_filter=[LMULType.M1], elt_filter=[EltType.U32], label_filter="vandn")
+    lines = generate_zvkb_emulation([], True, True, **kwargs).splitlines()
+    assert lines.index("#if !defined(__riscv_zvkb)") < lines.index("// prototypes")
+    assert lines[-1] == "#endif /* !defined(__riscv_zvkb) */"
+    assert "__riscv_zvkb" not in generate_zvkb_emulation([], True, True, native_guard=False, **kwargs)
+
+
+def test_brev8_lut():
+    code = generate_zvkb_emulation([], False, True, lmul_filter=[LMULType.M4], elt_filter=[EltType.U16],
+                                   tail_policy_filter=[TailPolicy.AGNOSTIC], mask_policy_filter=[MaskPolicy.UNMASKED],
+                                   label_filter="vbrev8", brev8_lut=True)
+    assert code.count("__riscv_vrgather_vv_u8m4(") == 2
+    assert "__riscv_vor_vv_u16m4(" in code
+    assert NIBBLE_REVERSE_LUT_LO == 0x0e060a020c040800
+
+
+def test_process_pool_output_order():
+    kwargs = dict(lmul_filter=[LMULType.M1, LMULType.M2], tail_policy_filter=[TailPolicy.AGNOSTIC])
+    assert generate_zvkb_emulation([], True, True, jobs=2, **kwargs) == generate_zvkb_emulation([], True, True, **kwargs)
+
+
+def test_rotate_left_negated_amount_and_policies():
+    code = generate_zvkb_emulation([], False, True, lmul_filter=[LMULType.M1], elt_filter=[EltType.U32],
+                                   tail_policy_filter=[TailPolicy.UNDISTURBED], mask_policy_filter=[MaskPolicy.UNDISTURBED],
+                                   label_filter="vrol_v[vx]")
+    assert "__riscv_vrsub_vx_u32m1(op1, 0, vl)" in code
+    assert "uint32_t tmp1 = 0 - op1;" in code
+    assert code.count("__riscv_vor_vv_u32m1_tumu(vm, vd, ") == 2
+
+
+def test_generation_is_memoized():
+    kwargs = dict(lmul_filter=[LMULType.M2], elt_filter=[EltType.U16], label_filter="vror")
+    first = generate_zvkb_emulation(["static"], True, True, **kwargs)
+    assert generate_zvkb_emulation(["static"], True, True, jobs=2, **kwargs) == first
+    assert generate_zvkb_emulation(["static"], True, True, **kwargs) == first
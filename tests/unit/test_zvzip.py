@@ -0,0 +1,187 @@
+"""Unit tests for the Zvzip interleave/deinterleave emulation"""
+
+import pytest
+from rie_generator.core import (
+    EltType,
+    LMULType,
+    NodeFormatDescriptor,
+    NodeFormatType,
+    Input,
+    TailPolicy,
+    MaskPolicy,
+)
+from rie_generator.zvzip_emulation import (
+    byte_pattern_mask,
+    generate_zvzip_emulation,
+    is_valid_zvzip_block,
+    periodic_mask_byte,
+    vpair_emulation,
+    vpair_operands,
+    vzip_emulation,
+    vzip_emulation_elen,
+)
+
+from lane_model import VLEN, evaluate
+
+
+@pytest.mark.parametrize("elt_type", [EltType.U16, EltType.U64])
+def test_vzip_operands_shared_across_policies(elt_type):
+    vuint_t = NodeFormatDescriptor(NodeFormatType.VECTOR, elt_type, LMULType.M1)
+    vl = Input(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T), 2, name="vl")
+    vm = Input(NodeFormatDescriptor(NodeFormatType.MASK, elt_type, LMULType.M2), -2, name="vm")
+    vd = Input(NodeFormatDescriptor(NodeFormatType.VECTOR, elt_type, LMULType.M2), -1, name="vd")
+    vs2 = Input(vuint_t, 0, name="vs2")
+    vs1 = Input(vuint_t, 1, name="vs1")
+    agnostic = vzip_emulation(vs1, vs2, vl, vm, None, TailPolicy.AGNOSTIC, MaskPolicy.AGNOSTIC)
+    undisturbed = vzip_emulation(vs1, vs2, vl, vm, vd, TailPolicy.UNDISTURBED, MaskPolicy.UNDISTURBED)
+    # only the final policy-carrying operation differs between variants
+    assert undisturbed is not agnostic
+    assert undisturbed.vm is vm and undisturbed.dst is vd
+    assert all(a is b for a, b in zip(undisturbed.args, agnostic.args))
+
+
+def test_vpair_merge_mask_is_shared_constant():
+    vuint_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U32, LMULType.M2)
+    vl = Input(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T), 2, name="vl")
+    _, _, vm_merge = vpair_operands(True, Input(vuint_t, 1, name="vs1"), Input(vuint_t, 0, name="vs2"), vl)
+    assert vm_merge is byte_pattern_mask(0x55, EltType.U32, LMULType.M2)
+    assert vm_merge.args[0].args[0].value == 0x55
+
+
+def test_vzip_elen_rgather():
+    code = generate_zvzip_emulation(lmul_filter=[LMULType.M2], elt_filter=[EltType.U64],
+                                    tail_policy_filter=[TailPolicy.AGNOSTIC], mask_policy_filter=[MaskPolicy.UNMASKED],
+                                    label_filter="vzip")
+    assert "__riscv_vcreate_v_u64m2_u64m4(vs2, vs1)" in code
+    # 16-bit indices for a u64m4 gather fit in a single register
+    assert "__riscv_vid_v_u16m1(" in code
+    assert "__riscv_vadd_vx_u16m1_mu(" in code
+    assert code.count("__riscv_vrgatherei16_vv_u64m4(") == 1
+    assert "vslide" not in code
+
+
+def test_vzip_zvbb_widening_shift():
+    kwargs = dict(lmul_filter=[LMULType.M1], elt_filter=[EltType.U8], tail_policy_filter=[TailPolicy.AGNOSTIC],
+                  label_filter="vzip", has_zvbb=True)
+    unmasked = generate_zvzip_emulation(mask_policy_filter=[MaskPolicy.UNMASKED], **kwargs)
+    assert "__riscv_vwsll_vx_u16m2(vs1, 8, vl)" in unmasked
+    assert "__riscv_vwaddu_wv_u16m2(" in unmasked
+    assert "vzext" not in unmasked and "__riscv_vor" not in unmasked
+    masked = generate_zvzip_emulation(mask_policy_filter=[MaskPolicy.AGNOSTIC], **kwargs)
+    assert "__riscv_vor_vx_u8m2_m(vm, " in masked
+
+
+@pytest.mark.parametrize("elt_type, tag, odd_shift", [(EltType.U8, "u8m1", 8), (EltType.U32, "u32m1", 32)])
+def test_vunzip_narrowing_shift(elt_type, tag, odd_shift):
+    code = generate_zvzip_emulation(lmul_filter=[LMULType.M1], elt_filter=[elt_type],
+                                    tail_policy_filter=[TailPolicy.AGNOSTIC], mask_policy_filter=[MaskPolicy.UNMASKED],
+                                    label_filter="vunzip")
+    assert f"__riscv_vnsrl_wx_{tag}(tmp0, 0, vl)" in code
+    assert f"__riscv_vnsrl_wx_{tag}(tmp0, {odd_shift}, vl)" in code
+    assert "vcompress" not in code
+
+
+def test_vunzip_elen_compresses_twice_vl():
+    code = generate_zvzip_emulation(lmul_filter=[LMULType.M1], elt_filter=[EltType.U64],
+                                    tail_policy_filter=[TailPolicy.AGNOSTIC], mask_policy_filter=[MaskPolicy.UNMASKED],
+                                    label_filter="vunzipe")
+    assert "size_t tmp2 = vl * 2;" in code
+    assert "__riscv_vcompress_vm_u64m2(op0, tmp1, tmp2)" in code
+
+
+@pytest.mark.parametrize("period, lanes, byte", [(2, (0,), 0x55), (2, (1,), 0xAA), (4, (1, 2), 0x66), (4, (3,), 0x88)])
+def test_periodic_mask_byte(period, lanes, byte):
+    assert periodic_mask_byte(period, *lanes) == byte
+
+
+def test_shared_subgraphs_emitted_once():
+    code = generate_zvzip_emulation(lmul_filter=[LMULType.M1], elt_filter=[EltType.U64],
+                                    tail_policy_filter=[TailPolicy.AGNOSTIC], mask_policy_filter=[MaskPolicy.UNMASKED],
+                                    label_filter="vzip", elen_slides=True)
+    # the spread vs1 is the source of both vslideups,
+    # 2 * vl feeds both zero-extensions
+    assert code.count("__riscv_vreinterpret_v_u64m2_u32m2(") == 2
+    assert code.count("= vl * 2;") == 1
+    assert code.count("= vl * 4;") == 1
+
+
+def test_vzip_widening_add_combine():
+    code = generate_zvzip_emulation(lmul_filter=[LMULType.M1], elt_filter=[EltType.U16],
+                                    tail_policy_filter=[TailPolicy.AGNOSTIC], mask_policy_filter=[MaskPolicy.UNMASKED],
+                                    label_filter="vzip")
+    assert code.count("__riscv_vzext_vf2_u32m2(") == 1
+    assert "__riscv_vwaddu_wv_u32m2(tmp1, vs2, vl)" in code
+    assert "__riscv_vor" not in code
+
+
+def test_process_pool_output_order():
+    kwargs = dict(lmul_filter=[LMULType.M1, LMULType.M2], elt_filter=[EltType.U8, EltType.U64],
+                  tail_policy_filter=[TailPolicy.AGNOSTIC], prototypes=True)
+    assert generate_zvzip_emulation(jobs=2, **kwargs) == generate_zvzip_emulation(**kwargs)
+
+
+@pytest.mark.parametrize("mask_policy, tag", [(MaskPolicy.UNDISTURBED, "_tumu(vm, vd, "), (MaskPolicy.AGNOSTIC, "_tum(vm, vd, ")])
+def test_vpair_masked(mask_policy, tag):
+    code = generate_zvzip_emulation(lmul_filter=[LMULType.M1], elt_filter=[EltType.U32],
+                                    tail_policy_filter=[TailPolicy.UNDISTURBED], mask_policy_filter=[mask_policy],
+                                    label_filter="vpaire")
+    # the merge is left unmasked, vm and the policies apply on its result
+    assert "__riscv_vmerge_vvm_u32m1(" in code
+    assert f"__riscv_vor_vx_u32m1{tag}" in code
+
+
+def test_block_emission_is_memoized():
+    kwargs = dict(lmul_filter=[LMULType.M4], elt_filter=[EltType.U16], attributes=["static"])
+    first = generate_zvzip_emulation(**kwargs)
+    assert generate_zvzip_emulation(**kwargs) == first
+
+
+@pytest.mark.parametrize("elt_type, lmul, valid", [
+    (EltType.U8, LMULType.MF8, True),
+    (EltType.U16, LMULType.MF8, False),
+    (EltType.U32, LMULType.MF2, True),
+    (EltType.U64, LMULType.MF2, False),
+    (EltType.U64, LMULType.M4, True),
+    (EltType.U8, LMULType.M8, False),
+])
+def test_valid_blocks(elt_type, lmul, valid):
+    assert is_valid_zvzip_block(elt_type, lmul) == valid
+
+
+def test_vzip_elen_slides_lane_order():
+    vuint_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U64, LMULType.M1)
+    vl = Input(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T), 2, name="vl")
+    vs2 = Input(vuint_t, 0, name="vs2")
+    vs1 = Input(vuint_t, 1, name="vs1")
+    # same operand order as generate_zvzip_block
+    emulation = vzip_emulation_elen(vs1, vs2, vl, None, None, TailPolicy.AGNOSTIC, MaskPolicy.UNMASKED)
+    env = {"vl": 2, "vs2": [0x1111111122222222, 0x3333333344444444],
+           "vs1": [0x5555555566666666, 0x7777777788888888]}
+    # each output pair is (vs2[i], vs1[i]), both 32-bit halves in place
+    assert evaluate(emulation, env) == [env["vs2"][0], env["vs1"][0], env["vs2"][1], env["vs1"][1]]
+
+
+@pytest.mark.parametrize("pair_even", [True, False])
+@pytest.mark.parametrize("tail_policy, mask_policy", [
+    (TailPolicy.UNDISTURBED, MaskPolicy.UNDISTURBED),
+    (TailPolicy.UNDISTURBED, MaskPolicy.AGNOSTIC),
+    (TailPolicy.AGNOSTIC, MaskPolicy.UNDISTURBED),
+])
+def test_vpair_masked_lanes(pair_even, tail_policy, mask_policy):
+    vuint_t = NodeFormatDescriptor(NodeFormatType.VECTOR, EltType.U32, LMULType.M1)
+    vl = Input(NodeFormatDescriptor(NodeFormatType.VECTOR_LENGTH, EltType.SIZE_T), 2, name="vl")
+    vm = Input(NodeFormatDescriptor(NodeFormatType.MASK, EltType.U32, LMULType.M1), -2, name="vm")
+    vd = Input(vuint_t, -1, name="vd")
+    vs2 = Input(vuint_t, 0, name="vs2")
+    vs1 = Input(vuint_t, 1, name="vs1")
+    # same operand order as generate_zvzip_block
+    emulation = vpair_emulation(pair_even, vs1, vs2, vl, vm, vd, tail_policy, mask_policy)
+    # lane 0 active, lanes 1 and 2 masked off, lane 3 in the tail
+    env = {"vl": 3, "vs2": [20, 21, 22, 23], "vs1": [10, 11, 12, 13], "vd": [90, 91, 92, 93],
+           "vm": [True, False, False, True] + [False] * (VLEN - 4)}
+    result = evaluate(emulation, env)
+    assert result[0] == (20 if pair_even else 21)
+    if mask_policy == MaskPolicy.UNDISTURBED:
+        assert result[1:3] == [91, 92]
+    if tail_policy == TailPolicy.UNDISTURBED:
+        assert result[3] == 93